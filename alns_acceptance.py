@@ -8,6 +8,10 @@ class CustomContainerAcceptance:
     or with a 5% random chance.
     """
 
+    def __init__(self, verbose: bool = False):
+        # Colored per-iteration prints are only emitted when verbose
+        self.verbose = verbose
+
     def __call__(self, rng: Any, best: Any, current: Any, candidate: Any) -> bool:
         """
         ALNS acceptance criterion interface.
@@ -30,13 +34,15 @@ class CustomContainerAcceptance:
         candidate_score = candidate.objective()
         best_score = best.objective()
 
-        print(f'New solution aggregate score: {candidate_score}, current best score: {best_score}')
+        if self.verbose:
+            print(f'New solution aggregate score: {candidate_score}, current best score: {best_score}')
 
         # Accept if better or with 5% random chance
         accept = candidate_score < best_score or random.random() < 0.05
 
-        # Print in green if True, red if False
-        color = '\033[92m' if accept else '\033[91m'
-        print(f'{color}Acceptance return value: {accept}\033[0m')
+        if self.verbose:
+            # Print in green if True, red if False
+            color = '\033[92m' if accept else '\033[91m'
+            print(f'{color}Acceptance return value: {accept}\033[0m')
 
         return accept
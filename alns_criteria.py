@@ -9,13 +9,16 @@ class CombinedStoppingCriterion:
         self.criteria = criteria
 
     def __call__(self, rng: Any, best: Any, current: Any) -> bool:
-        """Return True if any of the criteria say to stop."""
-        return any(criterion(rng, best, current) for criterion in self.criteria)
+        """Return True if any of the criteria say to stop (short-circuits on the first)."""
+        for criterion in self.criteria:
+            if criterion(rng, best, current):
+                return True
+        return False
 
 
 class StoppingCriterionWithProgress:
     """
-    Custom stopping criterion with progress printing.
+    Custom stopping criterion with progress printing (every `progress_every` iterations).
 
     Stops when ANY of the following is met:
         - elapsed wall-clock time >= time_limit (seconds)
@@ -23,40 +26,46 @@ class StoppingCriterionWithProgress:
         - no-improvement iterations >= max_no_improve
     """
 
-    def __init__(self, max_iterations: int, max_no_improve: int, time_limit: float):
+    def __init__(
+        self, max_iterations: int, max_no_improve: int, time_limit: float, progress_every: int = 50
+    ):
         if time_limit is None:
             raise ValueError("time_limit must be provided (seconds) and cannot be None")
         self.max_iterations = int(max_iterations)
         self.max_no_improve = int(max_no_improve)
         self.time_limit = float(time_limit)
-        self.start_time = time.time()
+        self.progress_every = max(1, int(progress_every))
+        # monotonic: immune to wall-clock adjustments, only differences are used
+        self.start_time = time.monotonic()
         self.iteration = 0
         self.no_improve = 0
         self._last_best_obj = float("inf")
 
     def __call__(self, rng: Any, best: Any, current: Any) -> bool:
         # Time-based stopping (checked first)
-        elapsed = time.time() - self.start_time
+        elapsed = time.monotonic() - self.start_time
         if elapsed >= self.time_limit:
             print("\nStopping: Time limit reached.")
             return True
 
         self.iteration += 1
 
-        # Check if the best solution has improved
-        if best.objective() < self._last_best_obj:
-            self._last_best_obj = best.objective()
+        # Check if the best solution has improved (evaluate the objective once)
+        best_obj = best.objective()
+        if best_obj < self._last_best_obj:
+            self._last_best_obj = best_obj
             self.no_improve = 0
         else:
             self.no_improve += 1
 
-        # Print progress
-        progress_bar = (
-            f"Iteration {self.iteration}/{self.max_iterations} | "
-            f"No improvement {self.no_improve}/{self.max_no_improve} | "
-            f"Time {elapsed:.1f}/{self.time_limit:.1f}s"
-        )
-        print(progress_bar)  # Use carriage return to print on the same line
+        # Print progress every `progress_every` iterations
+        if self.iteration % self.progress_every == 0:
+            progress_bar = (
+                f"Iteration {self.iteration}/{self.max_iterations} | "
+                f"No improvement {self.no_improve}/{self.max_no_improve} | "
+                f"Time {elapsed:.1f}/{self.time_limit:.1f}s"
+            )
+            print(progress_bar)
 
         # Check stopping conditions
         if self.iteration >= self.max_iterations:
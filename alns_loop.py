@@ -2,33 +2,39 @@
 ALNS loop for container loading using the official ALNS library.
 
 Loop summary (iterate):
-    1) select (RouletteWheel) a destroy + repair pair (only one pair registered).
+    1) select (RouletteWheel) a destroy + repair pair (CP-SAT or greedy FFD repair).
     2) destroy: copy state, remove num_remove items, set _removed_items.
-    3) repair: build Step-1 CP-SAT with fixed and free items, solve, rebuild assignment → new state.
+    3) repair: CP-SAT Step-1 with fixed and free items, or greedy first-fit-decreasing → new state.
     4) evaluate: candidate.objective() runs Phase-2 per container; compute aggregate_score.
     5) accept: CustomContainerAcceptance (feasible + better or 5% chance).
     6) stop: StoppingCriterionWithProgress (max iterations or max no-improve).
 """
 import json
+import logging
+import multiprocessing
 import time
 import os
 import sys
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 # ALNS library imports
 from alns import ALNS
 from alns.select import RouletteWheel
-from typing import Any, Callable, Dict, List, cast
+from typing import Any, Callable, Dict, List, Optional, Sequence, cast
 
 import numpy as np
 import numpy.random as rnd
 
 # Local modules
+import container_loading_state
 from container_loading_state import (
     ContainerLoadingState,
     Assignment,
     ContainerSpec,
+    ContainerEntry,
     Box,
+    clear_phase2_cache,
 )
 from alns_criteria import StoppingCriterionWithProgress
 from alns_acceptance import CustomContainerAcceptance
@@ -37,6 +43,216 @@ from alns_acceptance import CustomContainerAcceptance
 from step1_model_builder import build_step1_model
 from print_utils import dump_phase1_results
 
+# Per-iteration diagnostics (destroy/repair) go through logging so they cost nothing
+# unless DEBUG is enabled; run-level messages stay on print like the rest of the code.
+logger = logging.getLogger(__name__)
+
+# Repair models with fewer items than this use a lighter CP-SAT presolve
+SMALL_REPAIR_NUM_ITEMS = 50
+
+
+def _make_container(cid: int, size: Any) -> ContainerEntry:
+    """Create an empty container entry sharing the (immutable) container size tuple."""
+    return {'id': cid, 'size': size, 'boxes': []}
+
+
+def _add_repair_hints(
+    model: Any,
+    x: Dict[Any, Any],
+    y: List[Any],
+    volumes: List[int],
+    weights: List[Any],
+    fixed_container: np.ndarray,
+    max_containers: int,
+    container_volume: int,
+    container_weight: float,
+) -> None:
+    """
+    Warm-start the repair model with a complete, feasible assignment.
+
+    Fixed items (fixed_container[i] >= 0) are hinted in their current container; free
+    (removed, fixed_container[i] == -1) items are placed greedily in the first container whose remaining volume and weight admit
+    them, opening a new container otherwise. Hints are not enforced, so CP-SAT can
+    still improve on them.
+    """
+    volume_used = [0] * max_containers
+    weight_used = [0.0] * max_containers
+    hinted_container: List[int] = fixed_container.tolist()
+    free_indices: List[int] = []
+    for i, j in enumerate(hinted_container):
+        if j < 0:
+            free_indices.append(i)
+            continue
+        volume_used[j] += volumes[i]
+        weight_used[j] += weights[i]
+
+    for i in free_indices:
+        v = volumes[i]
+        w = weights[i]
+        for j in range(max_containers):
+            if volume_used[j] + v <= container_volume and weight_used[j] + w <= container_weight:
+                hinted_container[i] = j
+                volume_used[j] += v
+                weight_used[j] += w
+                break
+
+    used = [False] * max_containers
+    for i, hinted_j in enumerate(hinted_container):
+        if hinted_j < 0:
+            # Item does not fit anywhere on its own: leave it unhinted (partial hint)
+            continue
+        used[hinted_j] = True
+        for j in range(max_containers):
+            model.AddHint(x[i, j], 1 if j == hinted_j else 0)
+    complete = all(hinted_j >= 0 for hinted_j in hinted_container)
+    for j in range(max_containers):
+        if used[j] or complete:
+            model.AddHint(y[j], 1 if used[j] else 0)
+
+
+def _reinsert_first_fit(destroyed: ContainerLoadingState) -> ContainerLoadingState:
+    """
+    Reinsert `destroyed._removed_items` with first-fit-decreasing by volume.
+
+    Each item goes to the first container whose remaining volume and weight admit it,
+    trying containers that already hold the item's group_id first; a new container is
+    opened otherwise. Containers left empty by the destroy are dropped.
+    """
+    removed_items: Sequence[Box] = destroyed._removed_items
+    size = destroyed.container_size
+    cap_volume = destroyed.container_volume
+    cap_weight = destroyed.container_weight
+
+    def volume(box: Box) -> int:
+        return box['size'][0] * box['size'][1] * box['size'][2]
+
+    # Keep only non-empty containers; the repaired state renumbers them sequentially
+    containers: List[List[Box]] = [
+        list(c['boxes']) for c in destroyed.assignment if c['boxes']
+    ]
+    # Remaining capacity per container, preallocated for the containers that may be
+    # opened: the first-fit scan is a vectorised mask + argmax instead of a Python loop.
+    num_open = len(containers)
+    free_volume = np.full(num_open + len(removed_items), cap_volume, dtype=np.float64)
+    free_weight = np.full(num_open + len(removed_items), cap_weight, dtype=np.float64)
+    for k, boxes in enumerate(containers):
+        free_volume[k] -= sum(volume(b) for b in boxes)
+        free_weight[k] -= sum(b['weight'] for b in boxes)
+
+    # group_id -> indices of containers already holding members of that group
+    group_containers: Dict[Any, List[int]] = defaultdict(list)
+    for k, boxes in enumerate(containers):
+        for gid in {b.get('group_id') for b in boxes} - {None}:
+            group_containers[gid].append(k)
+
+    for item in sorted(removed_items, key=volume, reverse=True):
+        v = volume(item)
+        w = item['weight']
+        gid = item.get('group_id')
+        k = -1
+        # Try containers holding the item's group first, then first fit over all
+        for p in group_containers.get(gid, []) if gid is not None else []:
+            if v <= free_volume[p] and w <= free_weight[p]:
+                k = p
+                break
+        if k < 0:
+            fits = np.flatnonzero((free_volume[:num_open] >= v) & (free_weight[:num_open] >= w))
+            if fits.size:
+                k = int(fits[0])
+            else:
+                k = num_open
+                num_open += 1
+                containers.append([])
+        containers[k].append(item)
+        free_volume[k] -= v
+        free_weight[k] -= w
+        if gid is not None and k not in group_containers[gid]:
+            group_containers[gid].append(k)
+
+    new_assignment: Assignment = []
+    for k, boxes in enumerate(containers):
+        entry = _make_container(k + 1, size)
+        entry['boxes'] = boxes
+        new_assignment.append(entry)
+    repaired_state = ContainerLoadingState(
+        new_assignment, destroyed.container, destroyed.step2_settings_file, destroyed.verbose,
+        take_ownership=True, parallel=destroyed.parallel,
+    )
+    return repaired_state
+
+
+class _RepairModel:
+    """
+    Step-1 CP-SAT model over a fixed item set and container count, built once and
+    reused by successive repairs. Every item gets an exactly-one constraint; which
+    items stay where they are is expressed per solve through assumptions on x.
+    Items are indexed by ascending id.
+    """
+
+    __slots__ = (
+        'max_containers', 'num_existing', 'items', 'item_id_to_idx', 'volumes', 'weights',
+        'model', 'x', 'y', 'group_in_containers', 'group_ids', 'group_to_items',
+    )
+
+    def __init__(self, state: ContainerLoadingState, max_containers: int) -> None:
+        boxes: List[Box] = [*state._removed_items, *(b for c in state.assignment for b in c['boxes'])]
+        boxes.sort(key=lambda b: b['id'])
+        self.max_containers = max_containers  # type: int
+        # Containers of the destroyed state; the ones after them are new and interchangeable
+        self.num_existing = len(state.assignment)  # type: int
+        self.items = [
+            {
+                'id': box['id'],
+                'size': box['size'],
+                'weight': box['weight'],
+                'group_id': box.get('group_id'),
+                'rotation': box.get('rotation'),
+            }
+            for box in boxes
+        ]  # type: List[Dict[str, Any]]
+        self.item_id_to_idx = {item['id']: i for i, item in enumerate(self.items)}  # type: Dict[int, int]
+        self.group_to_items = defaultdict(list)  # type: Dict[Any, List[int]]
+        for i, item in enumerate(self.items):
+            if item['group_id'] is not None:
+                self.group_to_items[item['group_id']].append(i)
+        # Per-item volumes and weights, computed once and shared by the model and the hints
+        self.volumes = [item['size'][0] * item['size'][1] * item['size'][2] for item in self.items]  # type: List[int]
+        self.weights = [item['weight'] for item in self.items]  # type: List[Any]
+        (
+            self.model, self.x, self.y, self.group_in_containers, self.group_ids
+        ) = build_step1_model(
+            self.items,
+            state.container_size,
+            state.container_weight,
+            max_containers,
+            group_to_items=self.group_to_items,
+            group_penalty_lambda=1,
+            dump_inputs=False,
+            precomputed_volumes=self.volumes,
+            precomputed_weights=self.weights,
+            symmetry_breaking_from=self.num_existing,
+        )
+
+    def fixed_containers(self, state: ContainerLoadingState) -> Optional[np.ndarray]:
+        """
+        Model-indexed container of every item of `state`: the CP-SAT container index
+        (position in state.assignment) for placed items, -1 for removed ones.
+        Returns None when the state's items are not exactly the model's items.
+        """
+        n = len(self.items)
+        if len(state._removed_items) + sum(len(c['boxes']) for c in state.assignment) != n:
+            return None
+        fixed = np.full(n, -1, dtype=np.int32)
+        try:
+            for j, container in enumerate(state.assignment):
+                fixed[[self.item_id_to_idx[b['id']] for b in container['boxes']]] = j
+            for box in state._removed_items:
+                if fixed[self.item_id_to_idx[box['id']]] >= 0:
+                    return None
+        except KeyError:
+            return None
+        return fixed
+
 
 # --- ALNS Destroy Operator ---
 def create_destroy_random_items(num_remove: int):
@@ -45,52 +261,55 @@ def create_destroy_random_items(num_remove: int):
 
         Contract:
         - Input: current ContainerLoadingState (immutable by convention), rng
-        - Output: new ContainerLoadingState deep copy with some boxes removed
+        - Output: new ContainerLoadingState (structural copy via state.copy(): new
+            container dicts and box lists, box dicts shared copy-on-write and never
+            mutated in place) with some boxes removed
         - Side-effects on returned state: sets `_removed_items` list and
-            `_objective_computed=False` to force re-evaluation when needed.
+            calls invalidate() to force re-evaluation when needed.
     """
     def destroy_random_items(
         state: Any, rng: np.random.Generator, **kwargs: Any
     ) -> Any:
         """
         ALNS destroy operator: Randomly select items and unassign them from their containers.
-        Returns a new partial assignment (deep copy with some boxes removed).
+        Returns a new partial assignment (structural copy with some boxes removed).
         """
-        # Create a deep copy first (required by ALNS)
+        # Copy first (ALNS requires a new state): containers and box lists are new, the
+        # box dicts are shared with `state` and must not be mutated in place
         destroyed_state: ContainerLoadingState = cast(ContainerLoadingState, state).copy()
 
-        # Flatten all boxes with their container index
-        all_boxes = [
-            (c_idx, box_idx)
-            for c_idx, container in enumerate(destroyed_state.assignment)
-            for box_idx in range(len(container['boxes']))
-        ]
+        # Index boxes in flattened (container, box) order without materialising the pairs:
+        # starts[c] is the flat index of the first box of container c.
+        assignment = destroyed_state.assignment
+        counts = np.fromiter((len(c['boxes']) for c in assignment), dtype=np.int64, count=len(assignment))
+        total_boxes = int(counts.sum())
 
-        if len(all_boxes) == 0:
+        if total_boxes == 0:
             return destroyed_state
 
         # Randomly select items to remove (now configurable via closure)
-        remove_count = min(num_remove, len(all_boxes))
-        remove_indices = rng.choice(len(all_boxes), remove_count, replace=False)
-
-        removed_items: List[Box] = []
-        for idx in remove_indices:
-            c_idx, box_idx = all_boxes[idx]
-            removed_items.append(destroyed_state.assignment[c_idx]['boxes'][box_idx])
-            destroyed_state.assignment[c_idx]['boxes'][box_idx] = None  # Mark for removal
+        remove_count = min(num_remove, total_boxes)
+        remove_indices = rng.choice(total_boxes, remove_count, replace=False)
+        starts = np.cumsum(counts) - counts
+        c_arr = np.searchsorted(starts, remove_indices, side='right') - 1
+        local_arr = remove_indices - starts[c_arr]
+
+        removed_items: List[Box] = [
+            assignment[c_idx]['boxes'][box_idx] for c_idx, box_idx in zip(c_arr.tolist(), local_arr.tolist())
+        ]
 
-        # Remove None entries
-        for container in destroyed_state.assignment:
-            container['boxes'] = [box for box in container['boxes'] if box is not None]
+        # Drop removed boxes with one boolean mask per touched container
+        for c_idx in np.unique(c_arr).tolist():
+            container = assignment[c_idx]
+            keep = np.ones(len(container['boxes']), dtype=bool)
+            keep[local_arr[c_arr == c_idx]] = False
+            container['boxes'] = [box for box, k in zip(container['boxes'], keep.tolist()) if k]
 
         # Store removed items for the repair operator
         destroyed_state._removed_items = removed_items
-        destroyed_state._objective_computed = False  # Invalidate cached objective
+        destroyed_state.invalidate()  # untouched containers keep their cached phase 2 results
 
-        try:
-            print(f"Destroy removed {len(removed_items)} items across containers")
-        except Exception:
-            pass
+        logger.debug("Destroy removed %d items across containers", len(removed_items))
 
         return destroyed_state
 
@@ -98,18 +317,29 @@ def create_destroy_random_items(num_remove: int):
 
 
 # --- ALNS Repair Operator ---
-def create_repair_cpsat(max_time_in_seconds: float):
+def create_repair_cpsat(max_time_in_seconds: float, num_workers: int = 8, random_seed: int = 42):
     """
         Factory for a repair operator that uses CP-SAT Step-1 to reassign removed items.
 
         Contract:
         - Input: destroyed ContainerLoadingState with `_removed_items`, rng
-        - Build: combines removed (free) + currently placed (fixed) items; constructs
-            fixed_assignments and group_to_items; allows opening extra containers.
-        - Solve: Step-1 CP-SAT with a time limit (`max_time_in_seconds`).
+        - Build: a Step-1 model over removed (free) + currently placed (fixed) items
+            that may open extra containers, cached in the closure (see `_RepairModel`)
+            and rebuilt only when the item set or the container count changes. Per
+            solve, `_RepairModel.fixed_containers()` gives an int32 array with the
+            container of each fixed item (-1 for free ones); those placements are
+            passed as solver assumptions.
+        - Solve: Step-1 CP-SAT with a time limit (`max_time_in_seconds`), using a
+            portfolio of `num_workers` parallel search workers seeded with `random_seed`.
+            A single removed item is reinserted by first fit without calling CP-SAT.
+            A solve without a solution (time limit, or assumptions that cannot hold,
+            e.g. fixed items already over a container's capacity) also falls back to
+            first fit.
         - Output: new ContainerLoadingState with a full, repaired assignment.
     """
 
+    cached: "_RepairModel | None" = None
+
     def repair_cpsat(
         state: Any, rng: np.random.Generator, **kwargs: Any
     ) -> Any:
@@ -119,132 +349,151 @@ def create_repair_cpsat(max_time_in_seconds: float):
         """
         # Get removed items from the destroyed state
         destroyed: ContainerLoadingState = cast(ContainerLoadingState, state)
-        removed_items: List[Box] = getattr(destroyed, '_removed_items', [])
+        removed_items: Sequence[Box] = destroyed._removed_items
         if not removed_items:
             # Nothing to repair
             return destroyed
-
-        # Prepare items: combine removed_items and fixed items
-        all_items: List[Dict[str, Any]] = []
-        item_id_to_idx: Dict[int, int] = {}
-
-        # Add removed items first
-        for i, item in enumerate(removed_items):
-            all_items.append(
-                {
-                    'id': item['id'],
-                    'size': item['size'],
-                    'weight': item['weight'],
-                    'group_id': item.get('group_id'),
-                    'rotation': item.get('rotation'),
-                }
-            )
-            item_id_to_idx[item['id']] = i
-
-        # Add fixed items (from partial_assignment)
-        fixed_assignments: Dict[int, int] = {}
-        fixed_item_ids: set[int] = set()
-
-        # Build container mapping: original container id -> zero-based index for CP-SAT
-        container_id_to_cpsat_idx: Dict[int, int] = {}
-        for cpsat_idx, container in enumerate(destroyed.assignment):
-            container_id_to_cpsat_idx[container['id']] = cpsat_idx
-
-        for container in destroyed.assignment:
-            for box in container['boxes']:
-                if box['id'] not in item_id_to_idx:
-                    idx = len(all_items)
-                    all_items.append(
-                        {
-                            'id': box['id'],
-                            'size': box['size'],
-                            'weight': box['weight'],
-                            'group_id': box.get('group_id'),
-                            'rotation': box.get('rotation'),
-                        }
-                    )
-                    item_id_to_idx[box['id']] = idx
-                # Use the correct CP-SAT container index
-                fixed_assignments[box['id']] = container_id_to_cpsat_idx[container['id']]
-                fixed_item_ids.add(box['id'])
-
-        # Build group_to_items mapping
-        group_to_items: Dict[Any, List[int]] = defaultdict(list)
-        for idx, item in enumerate(all_items):
-            gid = item.get('group_id')
-            if gid is not None:
-                group_to_items[gid].append(idx)
+        if len(removed_items) == 1:
+            # A single item only has a handful of possible containers: first fit is
+            # enough and avoids building and solving a CP-SAT model
+            return _reinsert_first_fit(destroyed)
 
         # Container count: allow new containers for removed items
         max_containers: int = len(destroyed.assignment) + len(removed_items)
 
-        # Get container weight from the state
+        # The item set is the same on every repair of a run and the container count
+        # rarely changes: reuse the model and only swap assumptions and hints
+        nonlocal cached
+        fixed_container = None
+        if (
+            cached is not None
+            and cached.max_containers == max_containers
+            and cached.num_existing == len(destroyed.assignment)
+        ):
+            fixed_container = cached.fixed_containers(destroyed)
+        if fixed_container is None:
+            cached = _RepairModel(destroyed, max_containers)
+            fixed_container = cached.fixed_containers(destroyed)
+            if fixed_container is None:
+                raise ValueError('ALNS repair requires unique box ids')
+        repair_model = cached
+        model, x, y = repair_model.model, repair_model.x, repair_model.y
+        all_items = repair_model.items
         container_weight = destroyed.container_weight
 
-        # Build model
-        group_penalty_lambda: int = 1
-        model, x, y, group_in_containers, group_ids = build_step1_model(
-            all_items,
-            destroyed.container_size,
-            container_weight,
-            max_containers,
-            group_to_items=group_to_items,
-            fixed_assignments=fixed_assignments,
-            group_penalty_lambda=group_penalty_lambda,
-            dump_inputs=False,
+        model.ClearAssumptions()
+        model.ClearHints()
+        fixed_idx = np.flatnonzero(fixed_container >= 0)
+        model.AddAssumptions([x[i, j] for i, j in zip(fixed_idx.tolist(), fixed_container[fixed_idx].tolist())])
+
+        # Warm start from the destroyed assignment plus a greedy placement of removed items
+        _add_repair_hints(
+            model, x, y, repair_model.volumes, repair_model.weights,
+            fixed_container, max_containers, destroyed.container_volume, container_weight,
         )
 
         from ortools.sat.python import cp_model
 
         solver = cp_model.CpSolver()
         # Set time limit for the repair operator (configurable via factory)
-        print(f'repair_cp_sat max_time_in_seconds {max_time_in_seconds}')
+        logger.debug('ALNS repair CP-SAT max_time_in_seconds: %s', max_time_in_seconds)
         solver.parameters.max_time_in_seconds = max_time_in_seconds
-        print(f'ALNS repair CP-SAT max_time_in_seconds: {max_time_in_seconds}')
+        solver.parameters.num_workers = num_workers
+        # Draw the seed from the ALNS rng so successive repairs (and replicas) explore
+        # different search trees; fall back to the factory seed without an rng
+        solver.parameters.random_seed = (
+            int(rng.integers(0, 2**31 - 1)) if rng is not None else random_seed
+        )
+        solver.parameters.log_search_progress = False
+        if len(all_items) < SMALL_REPAIR_NUM_ITEMS:
+            # Small repair models: a light presolve leaves more of the short time
+            # budget to the search itself
+            solver.parameters.max_presolve_iterations = 1
+            solver.parameters.cp_model_probing_level = 0
+            solver.parameters.linearization_level = 0
         status = solver.Solve(model)
         dump_phase1_results(
             solver,
             status,
             x,
             y,
-            group_in_containers,
-            group_ids,
-            group_to_items,
+            repair_model.group_in_containers,
+            repair_model.group_ids,
+            repair_model.group_to_items,
             all_items,
             destroyed.container_size,
             container_weight,
             verbose=False,
         )
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            # No solution: UNKNOWN at the time limit, or INFEASIBLE because the fixed
+            # items are assumptions and the destroyed state may already break a
+            # capacity. The solution vector is empty, so fall back to first fit to
+            # still return a full assignment
+            return _reinsert_first_fit(destroyed)
+
+        # Read the whole solution once instead of one solver.Value() round-trip per variable
+        solution = np.asarray(solver.ResponseProto().solution, dtype=np.int64)
 
         # Build new assignment structure - use sequential container IDs
         new_assignment: Assignment = []
-        used_cpsat_indices: List[int] = [j for j in range(max_containers) if solver.Value(y[j])]
-
-        for cpsat_idx in used_cpsat_indices:
-            new_assignment.append(
-                {'id': len(new_assignment) + 1, 'size': destroyed.container_size, 'boxes': []}
-            )
-
-        # Assign items to containers using correct mapping
-        for i in range(len(all_items)):
-            for cpsat_idx in used_cpsat_indices:
-                if solver.Value(x[i, cpsat_idx]):
-                    # Find which new_assignment container corresponds to this cpsat_idx
-                    new_container_idx = used_cpsat_indices.index(cpsat_idx)
-                    new_assignment[new_container_idx]['boxes'].append(cast(Box, all_items[i]))
-                    break
+        used_cpsat_indices: List[int] = [j for j in range(max_containers) if solution[y[j].Index()]]
+        for _ in used_cpsat_indices:
+            new_assignment.append(_make_container(len(new_assignment) + 1, destroyed.container_size))
+
+        # values[i, k] is x[i, used_cpsat_indices[k]]; column k is new_assignment[k].
+        # Rows come back from np.nonzero in item order.
+        x_index = np.array(
+            [[x[i, j].Index() for j in used_cpsat_indices] for i in range(len(all_items))],
+            dtype=np.int64,
+        ).reshape(len(all_items), len(used_cpsat_indices))
+        rows, cols = np.nonzero(solution[x_index])
+        for i, k in zip(rows.tolist(), cols.tolist()):
+            new_assignment[k]['boxes'].append(cast(Box, all_items[i]))
 
         # Create new state with repaired assignment
         repaired_state = ContainerLoadingState(
-            new_assignment, destroyed.container, destroyed.step2_settings_file, destroyed.verbose
+            new_assignment, destroyed.container, destroyed.step2_settings_file, destroyed.verbose,
+            take_ownership=True, parallel=destroyed.parallel,
         )
         return repaired_state
 
     return repair_cpsat
 
 
-# --- Main ALNS Function ---
-def run_alns_with_library(
+# --- ALNS Cheap Repair Operator ---
+def create_repair_greedy_ffd():
+    """
+        Factory for a repair operator that reinserts removed items with first-fit-decreasing.
+
+        Contract:
+        - Input: destroyed ContainerLoadingState with `_removed_items`, rng
+        - Build: first-fit-decreasing reinsertion, see `_reinsert_first_fit`.
+        - Output: new ContainerLoadingState with a full, repaired assignment.
+
+        Much cheaper than `repair_cpsat` (no solver call), so RouletteWheel can favour
+        it during exploration and fall back to CP-SAT when it stops paying off.
+    """
+
+    def repair_greedy_ffd(
+        state: Any, rng: np.random.Generator, **kwargs: Any
+    ) -> Any:
+        """
+        ALNS repair operator: greedily reassign removed items (first-fit-decreasing by volume).
+        Returns a new complete assignment.
+        """
+        destroyed: ContainerLoadingState = cast(ContainerLoadingState, state)
+        removed_items: Sequence[Box] = destroyed._removed_items
+        if not removed_items:
+            # Nothing to repair
+            return destroyed
+
+        return _reinsert_first_fit(destroyed)
+
+    return repair_greedy_ffd
+
+
+def _single_run(
     initial_assignment: Assignment,
     container: ContainerSpec,
     step2_settings_file: str,
@@ -252,33 +501,21 @@ def run_alns_with_library(
     num_remove: int,
     time_limit: float,
     max_no_improve: int,
-    phase1_time_limit: float = 60,
-    seed: int = 42,
-    verbose: bool = False,
+    phase1_time_limit: float,
+    seed: int,
+    verbose: bool,
+    repair_num_workers: int,
+    phase2_processes: Optional[int] = None,
 ) -> ContainerLoadingState:
     """
-    Run ALNS using the official ALNS library.
-
-    Args:
-        initial_assignment: list of containers (output of step 1 or greedy fit)
-        container: dict-like with keys 'size' ([L, W, H]) and 'weight' (max kg)
-        step2_settings_file: path to step2 settings JSON
-        num_iterations: maximum iterations
-        num_remove: number of items to remove in destroy operator
-        time_limit: time limit in seconds
-        max_no_improve: max iterations without improvement
-        phase1_time_limit: time limit for CP-SAT solver in repair operator
-        seed: random seed
-
-    Returns:
-        best_solution: ContainerLoadingState
+    Run one ALNS trajectory from the initial assignment and return its best state.
+    Module-level so it can be dispatched to worker processes by run_alns_with_library.
+    phase2_processes, when given, caps this process's phase 2 pool (a replica's share
+    of the cores); 1 keeps phase 2 in process.
     """
-    # Convert relative path to absolute path for step2_settings_file
-    if not os.path.isabs(step2_settings_file):
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        step2_settings_file = os.path.join(base_dir, step2_settings_file)
-    print('***** Starting ALNS with official library ...')
-
+    if phase2_processes is not None:
+        # Only called this way in a spawned replica process: the pool is not started yet
+        container_loading_state.PHASE2_MAX_PROCESSES = phase2_processes
     # Create initial state, passing the weight needed for repair.
     initial_state = ContainerLoadingState(
         initial_assignment, container, step2_settings_file, verbose
@@ -294,19 +531,18 @@ def run_alns_with_library(
 
     # Add destroy and repair operators
     alns.add_destroy_operator(cast(Any, create_destroy_random_items(num_remove)))
-    alns.add_repair_operator(cast(Any, create_repair_cpsat(phase1_time_limit)))
+    alns.add_repair_operator(cast(Any, create_repair_cpsat(phase1_time_limit, repair_num_workers, seed)))
+    alns.add_repair_operator(cast(Any, create_repair_greedy_ffd()))
 
     # Selection, acceptance, and stopping criteria
 
     # ABOUT selection:
-    # With one destroy and one repair operator, RouletteWheel selection is trivial:
-    # it always picks the only pair. The reward vector [1,0,0,0] is conventional
-    # (update weights only on new global best). Decay controls smoothing, but
-    # with a single pair it has no effect on which operators are chosen.
-
-
-    select = RouletteWheel([1, 0, 0, 0], decay=1.0, num_destroy=1, num_repair=1)
-    accept = CustomContainerAcceptance()
+    # One destroy and two repair operators (CP-SAT and greedy first-fit-decreasing).
+    # Scores reward new global bests most, then improvements and acceptances. With
+    # decay < 1 the wheel learns whether the cheap greedy repair or CP-SAT pays off;
+    # CP-SAT then acts as occasional intensification.
+    select = RouletteWheel([5, 2, 1, 0], decay=0.85, num_destroy=1, num_repair=2)
+    accept = CustomContainerAcceptance(verbose)
     stop = StoppingCriterionWithProgress(num_iterations, max_no_improve, time_limit)
 
     print(
@@ -316,7 +552,85 @@ def run_alns_with_library(
 
     result = alns.iterate(initial_state, select, accept, stop)
     # ALNS returns a generic State; cast to our domain state for type-checkers
-    best_solution = cast(ContainerLoadingState, result.best_state)
+    return cast(ContainerLoadingState, result.best_state)
+
+
+# --- Main ALNS Function ---
+def run_alns_with_library(
+    initial_assignment: Assignment,
+    container: ContainerSpec,
+    step2_settings_file: str,
+    num_iterations: int,
+    num_remove: int,
+    time_limit: float,
+    max_no_improve: int,
+    phase1_time_limit: float = 60,
+    seed: int = 42,
+    verbose: bool = False,
+    repair_num_workers: int = 8,
+    num_replicas: int = 1,
+) -> ContainerLoadingState:
+    """
+    Run ALNS using the official ALNS library.
+
+    Args:
+        initial_assignment: list of containers (output of step 1 or greedy fit)
+        container: dict-like with keys 'size' ([L, W, H]) and 'weight' (max kg)
+        step2_settings_file: path to step2 settings JSON
+        num_iterations: maximum iterations
+        num_remove: number of items to remove in destroy operator
+        time_limit: time limit in seconds
+        max_no_improve: max iterations without improvement
+        phase1_time_limit: time limit for CP-SAT solver in repair operator
+        seed: random seed (also seeds the CP-SAT repair solver)
+        verbose: enable detailed logging
+        repair_num_workers: number of CP-SAT search workers used by the repair operator
+        num_replicas: number of independent ALNS runs (seeds seed, seed+1, ...) executed
+            in parallel processes; the best final state is returned
+
+    Returns:
+        best_solution: ContainerLoadingState
+    """
+    # Convert relative path to absolute path for step2_settings_file
+    if not os.path.isabs(step2_settings_file):
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        step2_settings_file = os.path.join(base_dir, step2_settings_file)
+    print('***** Starting ALNS with official library ...')
+    # Phase 2 results are cached by settings file path, not content: start each run clean
+    clear_phase2_cache()
+
+    # Container dimensions are constant for the whole run: share one immutable tuple
+    # across every state and container entry instead of per-state lists.
+    container = {'size': tuple(container['size']), 'weight': container['weight']}
+
+    if num_replicas <= 1:
+        best_solution = _single_run(
+            initial_assignment, container, step2_settings_file, num_iterations, num_remove,
+            time_limit, max_no_improve, phase1_time_limit, seed, verbose, repair_num_workers,
+        )
+    else:
+        # Independent replicas with consecutive seeds; keep the best final state.
+        # Split the CP-SAT repair workers and the phase 2 processes across replicas to
+        # avoid oversubscription.
+        # 'spawn': phase 1 has already started CP-SAT threads (and maybe the phase 2
+        # pool) in this process, and neither survives a fork.
+        workers_per_replica = max(1, repair_num_workers // num_replicas)
+        phase2_processes_per_replica = max(1, container_loading_state.PHASE2_MAX_PROCESSES // num_replicas)
+        with ProcessPoolExecutor(
+            max_workers=num_replicas, mp_context=multiprocessing.get_context('spawn')
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _single_run,
+                    initial_assignment, container, step2_settings_file, num_iterations, num_remove,
+                    time_limit, max_no_improve, phase1_time_limit, seed + k, verbose,
+                    workers_per_replica, phase2_processes_per_replica,
+                )
+                for k in range(num_replicas)
+            ]
+            replicas = [f.result() for f in futures]
+        best_solution = min(replicas, key=lambda state: state.objective())
+
     best_score = best_solution.objective()
     statuses = getattr(best_solution, 'statuses', None)
     if statuses is not None:
@@ -1,5 +1,8 @@
-import copy
-from typing import Any, Dict, List, Optional, Tuple, Literal, TypedDict, cast
+import multiprocessing
+import os
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple, Literal, TypedDict, cast
 
 from step2_box_placement_in_container import run_phase_2
 
@@ -21,12 +24,12 @@ class Box(BaseBox, total=False):
 
 class ContainerEntry(TypedDict):
     id: int
-    size: List[int]  # [L, W, H]
+    size: List[int] | Tuple[int, int, int]  # [L, W, H]
     boxes: List[Box]
 
 
 class ContainerSpec(TypedDict):
-    size: List[int]
+    size: List[int] | Tuple[int, int, int]
     weight: float
 
 
@@ -34,40 +37,162 @@ Status = Literal['OPTIMAL', 'FEASIBLE', 'INFEASIBLE', 'UNKNOWN']
 Assignment = List[ContainerEntry]
 
 
+# Phase 2 results by container content, shared by all states: a destroy/repair move
+# usually leaves most containers untouched, and those are not re-solved.
+PHASE2_CACHE_SIZE = 4096
+# Values are (status, step2_results, box ids in the order the results follow).
+_phase2_cache = OrderedDict()  # type: OrderedDict[Hashable, Tuple[str, Dict[str, Any], List[int]]]
+
+
+def clear_phase2_cache() -> None:
+    """Forget all cached phase 2 results (e.g. before a new problem or after editing a settings file)."""
+    _phase2_cache.clear()
+
+
+def _phase2_cache_key(
+    container_size: List[int] | Tuple[int, int, int], step2_settings_file: str, boxes: List[Box]
+) -> Hashable:
+    """
+    Everything run_phase_2 reads from its inputs. Boxes are keyed in id order because
+    repairs may list the same boxes in a different order; see _reorder_step2_results.
+    """
+    return (
+        tuple(container_size),
+        step2_settings_file,
+        tuple(sorted((b['id'], tuple(b['size']), b.get('weight'), b['rotation']) for b in boxes)),
+    )
+
+
+def _reorder_step2_results(
+    step2_results: Dict[str, Any], result_ids: List[int], boxes: List[Box]
+) -> Dict[str, Any]:
+    """Permute the per-box lists of a run_phase_2 result (computed for result_ids) to follow boxes."""
+    position = {box_id: k for k, box_id in enumerate(result_ids)}
+    order = [position[b['id']] for b in boxes]
+    reordered = dict(step2_results)
+    for field in ('perms_list', 'placements'):
+        values = step2_results.get(field)
+        if values:
+            reordered[field] = [values[k] for k in order]
+    return reordered
+
+
+# Containers are independent phase 2 problems: with several to solve they run in
+# parallel worker processes, one CP-SAT search worker each, instead of one after the
+# other with solver_phase2_num_workers each.
+PHASE2_MAX_PROCESSES = os.cpu_count() or 1
+_phase2_pool = None  # type: Optional[ProcessPoolExecutor]
+
+
+def _get_phase2_pool() -> ProcessPoolExecutor:
+    """Process pool shared by all states, started on first use ('spawn': CP-SAT threads and fork do not mix)."""
+    global _phase2_pool
+    if _phase2_pool is None:
+        _phase2_pool = ProcessPoolExecutor(
+            max_workers=PHASE2_MAX_PROCESSES, mp_context=multiprocessing.get_context('spawn')
+        )
+    return _phase2_pool
+
+
+def _placement_hints(boxes: List[Box]) -> Dict[int, Tuple[Sequence[int], int]]:
+    """
+    Phase 2 warm start from the placement each box got in the state it came from
+    (final_position/final_orientation survive destroy and repair).
+    """
+    return {
+        b['id']: (b['final_position'], b['final_orientation'])
+        for b in boxes
+        if b.get('final_orientation') is not None and 'final_position' in b
+    }
+
+
+def _clone_assignment(assignment: Assignment) -> Assignment:
+    """
+    Structural copy of an assignment: new container dicts and new box lists, while
+    the box dicts themselves are shared. Safe because box dicts are never mutated
+    in place (evaluate() replaces them copy-on-write, repair builds fresh ones).
+    """
+    return [
+        {'id': c['id'], 'size': c['size'], 'boxes': list(c['boxes'])}
+        for c in assignment
+    ]
+
+
 class ContainerLoadingState:
     """
     State class for ALNS that represents a container loading solution.
     Implements the required objective() method for the ALNS library.
     """
 
+    # States are created on every destroy/repair/copy; slots drop the per-instance
+    # __dict__. The ALNS library does not set ad-hoc attributes on states.
+    __slots__ = (
+        'assignment',
+        'container',
+        'container_size',
+        'container_weight',
+        'container_volume',
+        'step2_settings_file',
+        'verbose',
+        'statuses',
+        'aggregate_score',
+        'visualization_data',
+        '_objective_computed',
+        '_removed_items',
+        'parallel',
+    )
+
     def __init__(
         self,
         assignment: Assignment,
         container: ContainerSpec,
         step2_settings_file: str,
         verbose: bool = False,
+        take_ownership: bool = False,
+        parallel: bool = True,
     ) -> None:
         """
         assignment: list of containers, each is a dict with 'id', 'boxes' (list of box dicts)
         container: mapping with keys 'size' ([L, W, H]) and 'weight' (max weight)
         step2_settings_file: path to settings JSON for step 2
         verbose: bool, controls solver logging
+        take_ownership: if True, keep `assignment` as is instead of copying it. The caller
+            hands the container dicts and box lists over and must not mutate them
+            afterwards (box dicts may stay shared, they are never mutated in place).
+            Repair operators and copy() build fresh assignments and pass True.
+        parallel: solve containers in worker processes when several need phase 2
+            (see PHASE2_MAX_PROCESSES); False keeps evaluate() in this process
         """
-        self.assignment = copy.deepcopy(assignment)  # type: Assignment
+        if take_ownership:
+            self.assignment = assignment  # type: Assignment
+        else:
+            # Containers, box lists and box dicts are all copied: the caller keeps its objects
+            self.assignment = [
+                {**c, 'boxes': [dict(b) for b in c.get('boxes', [])]}
+                for c in assignment
+            ]
         # Store the provided container spec and unpack convenience fields
         self.container = container  # type: ContainerSpec
-        self.container_size = container["size"]  # type: List[int]
+        self.container_size = container["size"]  # type: List[int] | Tuple[int, int, int]
         self.container_weight = container["weight"]  # type: float
+        size = self.container_size
+        self.container_volume = size[0] * size[1] * size[2]  # type: int
+        if self.container_volume <= 0:
+            raise ValueError(
+                f"Invalid container volume: {self.container_volume}. Container dimensions: {self.container_size}"
+            )
         self.step2_settings_file = step2_settings_file  # type: str
         self.verbose = verbose  # type: bool
+        self.parallel = parallel  # type: bool
         self.statuses = []  # type: List[Status]
         self.aggregate_score = None  # type: Optional[float]
-        # Store visualization info per container (solver timing, placements, status, etc.)
+        # Store visualization info per container (solver timing, placements, status, etc.);
+        # entries are run_phase_2 results shared between states and must not be mutated
         self.visualization_data = []  # type: List[Optional[Dict[str, Any]]]
         self._objective_computed = False  # type: bool
         # Placeholder used by ALNS destroy/repair operators to pass removed items
         # between operators without mutating the original state.
-        self._removed_items = []  # type: List[Box]
+        self._removed_items = ()  # type: Sequence[Box]
 
     def objective(self) -> float:
         """
@@ -84,59 +209,135 @@ class ContainerLoadingState:
         Also update each box in the assignment with its actual orientation and position.
         Store visualization info for each container.
         """
-        self.statuses = []
-        self.visualization_data = []
-        container_volume = self.container_size[0] * self.container_size[1] * self.container_size[2]
-        if container_volume <= 0:
-            raise ValueError(
-                f"Invalid container volume: {container_volume}. Container dimensions: {self.container_size}"
-            )
+        n_containers = len(self.assignment)
+        # Filled by index below; fresh lists because copies may still hold the old ones
+        self.statuses = cast(List[Status], ['INFEASIBLE'] * n_containers)
+        self.visualization_data = [None] * n_containers
 
-        for cont in self.assignment:
-            print(f'**** Running phase 2 for container {cont["id"]} with size {self.container_size}')
+        # Look up every container in the phase 2 cache first, then solve the rest
+        results = [None] * n_containers  # type: List[Optional[Tuple[str, Dict[str, Any]]]]
+        to_solve = []  # type: List[int]
+        for c_idx, cont in enumerate(self.assignment):
             boxes = cont.get('boxes', [])
             if not boxes:
-                self.statuses.append('INFEASIBLE')
-                self.visualization_data.append(None)
+                # Never solved or sent to the pool; keeps the 'INFEASIBLE' status (and penalty)
+                # so that states carrying an unused, opened container score worse.
                 continue
+            cached = _phase2_cache.get(_phase2_cache_key(self.container_size, self.step2_settings_file, boxes))
+            if cached is None:
+                to_solve.append(c_idx)
+                continue
+            status, step2_results, result_ids = cached
+            if any(box_id != b['id'] for box_id, b in zip(result_ids, boxes)):
+                step2_results = _reorder_step2_results(step2_results, result_ids, boxes)
+            results[c_idx] = (status, step2_results)
+            if self.verbose:
+                print(f'Reusing cached phase 2 result for container {cont["id"]}')
 
-            # Run step 2 placement and get placements and visualization info
-            status, step2_results = run_phase_2(
-                {"id": cont['id'], "size": self.container_size}, boxes,
-                self.step2_settings_file, self.verbose
+        if self.parallel and len(to_solve) > 1 and PHASE2_MAX_PROCESSES > 1:
+            pool = _get_phase2_pool()
+            # Workers run quietly: their output would interleave
+            futures = [
+                pool.submit(
+                    run_phase_2,
+                    {"id": self.assignment[c_idx]['id'], "size": self.container_size},
+                    self.assignment[c_idx]['boxes'], self.step2_settings_file, False, 1,
+                    _placement_hints(self.assignment[c_idx]['boxes']),
+                )
+                for c_idx in to_solve
+            ]
+            for c_idx, future in zip(to_solve, futures):
+                results[c_idx] = future.result()
+        else:
+            for c_idx in to_solve:
+                cont = self.assignment[c_idx]
+                if self.verbose:
+                    print(f'**** Running phase 2 for container {cont["id"]} with size {self.container_size}')
+                results[c_idx] = run_phase_2(
+                    {"id": cont['id'], "size": self.container_size}, cont['boxes'],
+                    self.step2_settings_file, self.verbose, hints=_placement_hints(cont['boxes'])
+                )
+                if self.verbose:
+                    print(f'Completed run of phase 2 for container {cont["id"]} with size {self.container_size}')
+        for c_idx in to_solve:
+            boxes = self.assignment[c_idx]['boxes']
+            status, step2_results = cast(Tuple[str, Dict[str, Any]], results[c_idx])
+            _phase2_cache[_phase2_cache_key(self.container_size, self.step2_settings_file, boxes)] = (
+                status, step2_results, [b['id'] for b in boxes]
             )
-            print(f'Completed run of phase 2 for container {cont["id"]} with size {self.container_size}')
-            self.statuses.append(cast(Status, status))
-            self.visualization_data.append(step2_results)
+            if len(_phase2_cache) > PHASE2_CACHE_SIZE:
+                _phase2_cache.popitem(last=False)
+
+        log_lines = []  # type: List[str]
+        for c_idx, (cont, result) in enumerate(zip(self.assignment, results)):
+            boxes = cont.get('boxes', [])
+            if result is None:
+                continue
+            status, step2_results = result
+            self.statuses[c_idx] = cast(Status, status)
+            self.visualization_data[c_idx] = step2_results
 
             placements = step2_results.get('placements', []) if isinstance(step2_results, dict) else []
-            placement_map = {p['id']: p for p in placements}
-            for box in boxes:
-                p = placement_map.get(box['id'])
-                if p is not None:
-                    box['final_position'] = p['position']
-                    box['final_orientation'] = p['orientation']
-
-            print(
-                f'Container {cont["id"]}: status={status}, n_boxes={len(boxes)}, '
-                f'n_placements={len(placements) if placements else 0}'
-            )
+            # Box dicts may be shared with other states (see _clone_assignment):
+            # write the final placement into fresh copies instead of mutating them.
+            if len(placements) == len(boxes):
+                # run_phase_2 returns placements in input box order
+                cont['boxes'] = [
+                    {**box, 'final_position': p['position'], 'final_orientation': p['orientation']}
+                    for box, p in zip(boxes, placements)
+                ]
+            elif placements:
+                # Partial results only; with none (no solution) the boxes are left as they are
+                placement_map = {p['id']: p for p in placements}
+                updated: List[Box] = []
+                for box in boxes:
+                    p = placement_map.get(box['id'])
+                    if p is not None:
+                        box = {**box, 'final_position': p['position'], 'final_orientation': p['orientation']}
+                    updated.append(box)
+                cont['boxes'] = updated
 
-        penalty = 1000 * self.statuses.count('INFEASIBLE') + 500 * self.statuses.count('UNKNOWN')
-        optimal_bonus = 2 * self.statuses.count('OPTIMAL')
-        feasible_bonus = 1 * self.statuses.count('FEASIBLE')
+            if self.verbose:
+                log_lines.append(
+                    f'Container {cont["id"]}: status={status}, n_boxes={len(boxes)}, '
+                    f'n_placements={len(placements) if placements else 0}'
+                )
+
+        status_counts = Counter(self.statuses)
+        penalty = 1000 * status_counts['INFEASIBLE'] + 500 * status_counts['UNKNOWN']
+        optimal_bonus = 2 * status_counts['OPTIMAL']
+        feasible_bonus = 1 * status_counts['FEASIBLE']
         self.aggregate_score = penalty - optimal_bonus - feasible_bonus
 
-        print('')
-        print(
-            f'\033[94mAggregate score: {self.aggregate_score} '
-            f'(penalty={penalty} - optimal_bonus={optimal_bonus} - feasible_bonus={feasible_bonus})\033[0m'
-        )
+        if self.verbose:
+            # One write for the per-container summary instead of a print per line
+            log_lines.append('')
+            log_lines.append(
+                f'\033[94mAggregate score: {self.aggregate_score} '
+                f'(penalty={penalty} - optimal_bonus={optimal_bonus} - feasible_bonus={feasible_bonus})\033[0m'
+            )
+            print('\n'.join(log_lines))
 
         self._objective_computed = True
         # aggregate_score is set above
         return float(self.aggregate_score) if self.aggregate_score is not None else 0.0
 
+    def invalidate(self, container_id: Optional[int] = None) -> None:
+        """
+        Mark the objective as stale after the assignment was changed in place.
+        Phase 2 results are cached by container content, so the next evaluate() only
+        solves containers whose boxes changed. container_id additionally drops the
+        cached result for that container's current boxes, forcing it to be re-solved.
+        """
+        self._objective_computed = False
+        if container_id is not None:
+            for cont in self.assignment:
+                if cont['id'] == container_id:
+                    _phase2_cache.pop(
+                        _phase2_cache_key(self.container_size, self.step2_settings_file, cont.get('boxes', [])),
+                        None,
+                    )
+
     def is_feasible(self) -> bool:
         """Check if all containers have feasible solutions."""
         if not self._objective_computed:
@@ -144,14 +345,20 @@ class ContainerLoadingState:
         return 'INFEASIBLE' not in self.statuses
 
     def copy(self) -> "ContainerLoadingState":
-        """Create a deep copy of this state."""
+        """Create a copy of this state (structural copy of the assignment, see _clone_assignment)."""
         new_state = ContainerLoadingState(
-            self.assignment, self.container,
-            self.step2_settings_file, self.verbose
+            _clone_assignment(self.assignment), self.container,
+            self.step2_settings_file, self.verbose, take_ownership=True, parallel=self.parallel
         )
         new_state.statuses = self.statuses.copy()
         new_state.aggregate_score = self.aggregate_score
-        new_state.visualization_data = copy.deepcopy(self.visualization_data)
+        # run_phase_2 results are write-once (and shared with the phase 2 cache): copy the
+        # list, share the result dicts. Callers must not mutate them.
+        new_state.visualization_data = list(self.visualization_data)
         new_state._objective_computed = self._objective_computed
-        new_state._removed_items = copy.deepcopy(self._removed_items)
+        new_state._removed_items = list(self._removed_items)
         return new_state
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> "ContainerLoadingState":
+        """copy.deepcopy(state) goes through copy(), not the generic object walk."""
+        return self.copy()
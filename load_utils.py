@@ -1,5 +1,24 @@
+import functools
 import json
 import os
+from pathlib import Path
+
+
+@functools.lru_cache(maxsize=16)
+def _parse_json_file(path, mtime_ns, size):
+    return json.loads(Path(path).read_bytes())
+
+
+def load_json_cached(path):
+    """
+    Parse a JSON file once per (path, modification time, size) and reuse the result.
+
+    Meant for read-only settings files that are consulted on every call (e.g. the
+    phase 2 settings read by run_phase_2 for each container the ALNS evaluates).
+    The returned object is shared between callers and must not be mutated.
+    """
+    st = os.stat(path)
+    return _parse_json_file(os.path.abspath(path), st.st_mtime_ns, st.st_size)
 
 def load_data_from_json(input_file):
     """
@@ -25,8 +44,7 @@ def load_data_from_json(input_file):
     
     try:
         # Handle file reading errors
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = json.loads(Path(input_file).read_bytes())
     except PermissionError:
         raise PermissionError(f"Permission denied reading file: {input_file}")
     except json.JSONDecodeError as e:
@@ -57,14 +75,16 @@ def load_data_from_json(input_file):
         if not isinstance(boxes, list) or len(boxes) == 0:
             raise ValueError("Boxes must be a non-empty list")
         
-        # Validate each box has required fields
+        # Validate each box has required fields (loop-invariant lookups built once)
+        required_box_fields = ('id', 'size', 'weight')
+        required_box_field_set = frozenset(required_box_fields)
+        valid_rotations = frozenset(('none', 'z', 'free'))
         for i, box in enumerate(boxes):
             if not isinstance(box, dict):
                 raise ValueError(f"Box {i} must be a dictionary")
             
-            required_box_fields = ['id', 'size', 'weight']
-            missing_box_fields = [field for field in required_box_fields if field not in box]
-            if missing_box_fields:
+            if not box.keys() >= required_box_field_set:
+                missing_box_fields = [field for field in required_box_fields if field not in box]
                 raise ValueError(f"Box {i} missing required fields: {missing_box_fields}")
             
             # Validate box dimensions
@@ -82,7 +102,7 @@ def load_data_from_json(input_file):
             if 'rotation' not in box:
                 raise ValueError(f"Box {i} missing required field 'rotation'")
             rot = box['rotation']
-            if rot not in ('none', 'z', 'free'):
+            if rot not in valid_rotations:
                 raise ValueError(f"Box {i} invalid rotation '{rot}'. Must be one of ['none','z','free']")
         
     except (TypeError, ValueError) as e:
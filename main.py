@@ -5,14 +5,23 @@ import time
 from collections import defaultdict
 from ortools.sat.python import cp_model
 
-from step1_model_builder import build_step1_model
+from step1_model_builder import build_step1_model, first_fit_decreasing, step1_objective
 from print_utils import dump_phase1_results
 from alns_loop import run_alns_with_library
-from typing import TYPE_CHECKING
-if TYPE_CHECKING:
-    from container_loading_state import ContainerLoadingState
-from step2_box_placement_in_container import run_phase_2
-from visualization_utils import visualize_solution
+from container_loading_state import ContainerLoadingState
+
+# Orientation index -> axis order string
+_ORIENTATION_DESC = ("L,W,H", "L,H,W", "W,L,H", "W,H,L", "H,L,W", "H,W,L")
+# 'z' rotation only turns the box around its height: its two codes are (L,W,H), (W,L,H)
+_Z_ORIENTATION_DESC = ("L,W,H", "W,L,H")
+
+
+def _rotation_desc(placement):
+    """Axis order of a phase 2 placement's 'orientation' code, None when the box is unplaced."""
+    code = placement.get('orientation')
+    table = _Z_ORIENTATION_DESC if placement.get('rotation_type') == 'z' else _ORIENTATION_DESC
+    return table[code] if isinstance(code, int) and 0 <= code < len(table) else None
+
 
 def main():
     """
@@ -25,23 +34,10 @@ def main():
     parser.add_argument('--output', type=str, required=True, help="Path to the output JSON file for the final solution.")
     parser.add_argument('--no-alns', action='store_true', help="Skip the ALNS refinement step and go straight from Phase 1 to Phase 2.")
     parser.add_argument('--verbose', action='store_true', help="Enable detailed logging throughout the process.")
+    parser.add_argument('--visualize', action='store_true', help="Show a 3D Matplotlib plot of each packed container at the end of the run.")
+    parser.add_argument('--num-workers', type=int, default=8, help="Number of parallel CP-SAT search workers for the assignment (Phase 1 and ALNS repair) models.")
     args = parser.parse_args()
 
-    # Utility: map orientation index -> axis order string
-    def _orientation_desc(o):
-        try:
-            mapping = {
-                0: "L,W,H",
-                1: "L,H,W",
-                2: "W,L,H",
-                3: "W,H,L",
-                4: "H,L,W",
-                5: "H,W,L",
-            }
-            return mapping.get(int(o)) if o is not None else None
-        except Exception:
-            return None
-
     # --- 1. Load Input Data ---
     print(f"--- Loading Input Data from {args.input} ---")
     if not os.path.exists(args.input):
@@ -82,6 +78,14 @@ def main():
     max_containers = len(items)
     group_penalty_lambda = 1.0 # This could be made configurable
 
+    # First-fit-decreasing upper bound. Every term of the objective besides the container
+    # count is >= 0, so an optimal solution uses at most (FFD objective) containers.
+    ffd_bins = first_fit_decreasing(items, container_size, container_weight)
+    if all(b >= 0 for b in ffd_bins):
+        ffd_objective = step1_objective(items, ffd_bins, group_to_items, group_penalty_lambda)
+        max_containers = max(1, min(len(items), int(ffd_objective)))
+        print(f'First-fit-decreasing: {max(ffd_bins) + 1} containers, objective {ffd_objective:.1f}; max_containers = {max_containers}')
+
     model, x, y, group_in_containers, group_ids = build_step1_model(
         items, container_size, container_weight, max_containers,
         group_to_items=group_to_items,
@@ -90,7 +94,11 @@ def main():
     )
 
     solver = cp_model.CpSolver()
-    #solver.parameters.log_search_progress = args.verbose
+    solver.parameters.num_workers = args.num_workers
+    solver.parameters.log_search_progress = data.get('log_search_progress', args.verbose)
+    # Probing in presolve costs more than it prunes on this assignment model: without it
+    # the sample instances reach optimality in about half the time
+    solver.parameters.cp_model_probing_level = 0
     phase1_time_limit = data.get('solver_phase1_max_time_in_seconds', 60)
     print(f'Running Phase 1 baseline with time limit {phase1_time_limit} seconds')
     solver.parameters.max_time_in_seconds = phase1_time_limit
@@ -106,18 +114,20 @@ def main():
         sys.exit(1)
 
     # Extract the initial assignment
-    initial_assignment = []
-    used_container_indices = [j for j in range(max_containers) if solver.Value(y[j])]
-    container_rebase = {old_idx: new_idx + 1 for new_idx, old_idx in enumerate(used_container_indices)}
-    for old_j in used_container_indices:
-        new_j = container_rebase[old_j]
-        items_in_container = [i for i in range(len(items)) if solver.Value(x[i, old_j])]
-        container_entry = {
-            'id': new_j,
-            'size': container_size,
-            'boxes': [items[i] for i in items_in_container]
-        }
-        initial_assignment.append(container_entry)
+    # Read the whole solution once instead of one solver.Value() round-trip per variable
+    solution = solver.ResponseProto().solution
+    boxes_by_container = {j: [] for j in range(max_containers) if solution[y[j].Index()]}
+    # Each item is in exactly one container: stop at the first used one that holds it
+    for i, item in enumerate(items):
+        for old_j, boxes_in_container in boxes_by_container.items():
+            if solution[x[i, old_j].Index()]:
+                boxes_in_container.append(item)
+                break
+    # Used containers are renumbered 1..k in index order
+    initial_assignment = [
+        {'id': new_j, 'size': container_size, 'boxes': boxes_in_container}
+        for new_j, boxes_in_container in enumerate(boxes_by_container.values(), start=1)
+    ]
 
     best_assignment = initial_assignment
 
@@ -133,6 +143,7 @@ def main():
             num_can_be_moved_percentage = alns_params.get('num_can_be_moved_percentage', 10)
             time_limit = alns_params.get('time_limit', 60)
             max_no_improve = alns_params.get('max_no_improve', 20)
+            num_replicas = alns_params.get('num_replicas', 1)
             
             num_remove = max(1, int(len(items) * num_can_be_moved_percentage / 100))
 
@@ -141,7 +152,8 @@ def main():
                 initial_assignment,
                 {"size": container_size, "weight": container_weight},
                 step2_settings_file,
-                num_iterations, num_remove, time_limit, max_no_improve, phase1_time_limit, verbose=args.verbose
+                num_iterations, num_remove, time_limit, max_no_improve, phase1_time_limit, verbose=args.verbose,
+                repair_num_workers=args.num_workers, num_replicas=num_replicas,
             )
             # Extract best assignment and attach placements/status so orientations are present in the output
             best_assignment = best_state.assignment
@@ -152,23 +164,26 @@ def main():
                     container['status'] = vis_list[c_idx].get('status_str')
 
             # Visualize ALNS best solution per container using stored phase-2 info
-            try:
-                import matplotlib.pyplot as plt  # ensure matplotlib is available
-                for c_idx, container in enumerate(best_assignment):
-                    if c_idx < len(vis_list) and vis_list[c_idx] is not None and container.get('boxes'):
-                        step2_viz = vis_list[c_idx]
-                        plt_obj = visualize_solution(
-                            step2_viz.get('elapsed_time'),
-                            {"id": container.get('id'), "size": container_size},
-                            container.get('boxes', []),
-                            step2_viz.get('placements', []),
-                            step2_viz.get('status_str'),
-                        )
-                        plt_obj.show(block=False)
-            except ImportError:
-                print("matplotlib not available; skipping ALNS visualization.")
-            except Exception as e:
-                print(f"Visualization error: {e}")
+            if args.visualize:
+                try:
+                    # Imported only when plotting: matplotlib is slow to load
+                    from visualization_utils import visualize_solution
+                    import matplotlib.pyplot as plt  # ensure matplotlib is available
+                    for c_idx, container in enumerate(best_assignment):
+                        if c_idx < len(vis_list) and vis_list[c_idx] is not None and container.get('boxes'):
+                            step2_viz = vis_list[c_idx]
+                            plt_obj = visualize_solution(
+                                step2_viz.get('elapsed_time'),
+                                {"id": container.get('id'), "size": container_size},
+                                container.get('boxes', []),
+                                step2_viz.get('placements', []),
+                                step2_viz.get('status_str'),
+                            )
+                            plt_obj.show(block=False)
+                except ImportError:
+                    print("matplotlib not available; skipping ALNS visualization.")
+                except Exception as e:
+                    print(f"Visualization error: {e}")
            
     else:
         print("\n--- Skipping ALNS Refinement Step ---")
@@ -183,7 +198,18 @@ def main():
             print("Error: 'step2_settings_file' not found. Cannot run Phase 2.", file=sys.stderr)
             sys.exit(1)
 
-        for container_to_pack in best_assignment:
+        # The containers are independent: evaluate() solves them in parallel worker
+        # processes (see PHASE2_MAX_PROCESSES) and fills in each box's final placement
+        print(f"--- Packing {sum(1 for c in best_assignment if c['boxes'])} container(s) ---")
+        phase2_state = ContainerLoadingState(
+            best_assignment, {"size": container_size, "weight": container_weight},
+            step2_settings_file, verbose=args.verbose, take_ownership=True,
+        )
+        phase2_state.evaluate()
+
+        for container_to_pack, status_str, step2_results in zip(
+            best_assignment, phase2_state.statuses, phase2_state.visualization_data
+        ):
             container_id = container_to_pack['id']
             boxes_in_container = container_to_pack['boxes']
             
@@ -191,36 +217,32 @@ def main():
                 print(f"Container {container_id} is empty, skipping placement.")
                 continue
 
-            print(f"--- Packing Container ID: {container_id} ---")
-            status_str, step2_results = run_phase_2(
-                {"id": container_id, "size": container_size}, boxes_in_container,
-                step2_settings_file, verbose=args.verbose
-            )
+            print(f"--- Packed Container ID: {container_id} ({status_str}) ---")
             placements = step2_results.get('placements', []) if isinstance(step2_results, dict) else []
             container_to_pack['placements'] = placements
             container_to_pack['status'] = status_str
             # Visualize Phase 2 result for this container (show container id in title)
-            try:
-                import matplotlib.pyplot as plt  # gate visualization to avoid visualize_solution exiting on ImportError
-                plt_obj = visualize_solution(
-                    step2_results.get('elapsed_time'),
-                    {"id": container_id, "size": container_size},
-                    boxes_in_container,
-                    placements,
-                    status_str,
-                )
-                plt_obj.show(block=False)
-            except ImportError:
-                print("matplotlib not available; skipping Phase 2 visualization.")
-            except Exception as e:
-                print(f"Visualization error: {e}")
+            if args.visualize:
+                try:
+                    from visualization_utils import visualize_solution
+                    import matplotlib.pyplot as plt  # gate visualization to avoid visualize_solution exiting on ImportError
+                    plt_obj = visualize_solution(
+                        step2_results.get('elapsed_time'),
+                        {"id": container_id, "size": container_size},
+                        boxes_in_container,
+                        placements,
+                        status_str,
+                    )
+                    plt_obj.show(block=False)
+                except ImportError:
+                    print("matplotlib not available; skipping Phase 2 visualization.")
+                except Exception as e:
+                    print(f"Visualization error: {e}")
            
         # Add rotation description to each placement before saving output
         for container in best_assignment:
-            placements = container.get('placements', [])
-            for placement in placements:
-                rotation_idx = placement.get('rotation_idx')
-                placement['rotation_desc'] = _orientation_desc(rotation_idx)
+            for placement in container.get('placements', ()):
+                placement['rotation_desc'] = _rotation_desc(placement)
 
     # --- 5. Save Output ---
     print(f"\n--- Saving Final Solution to {args.output} ---")
@@ -229,12 +251,11 @@ def main():
         os.makedirs(output_dir, exist_ok=True)
 
   
-    # Remove 'boxes' from each container before saving output
-    output_assignment = []
-    for container in best_assignment:
-        container_copy = dict(container)
-        container_copy.pop('boxes', None)
-        output_assignment.append(container_copy)
+    # Remove 'boxes' from each container before saving output (copy only the kept keys)
+    output_assignment = [
+        {key: value for key, value in container.items() if key != 'boxes'}
+        for container in best_assignment
+    ]
     with open(args.output, 'w') as f:
         json.dump(output_assignment, f, indent=2)
 
@@ -244,8 +265,9 @@ def main():
     if not all(c.get('status') in ('OPTIMAL', 'FEASIBLE') for c in best_assignment if c.get('boxes')):
         print("Warning: One or more containers could not be feasibly packed.", file=sys.stderr)
     
-    print("Press Enter to close visualization windows and exit.")
-    input()
+    if args.visualize:
+        print("Press Enter to close visualization windows and exit.")
+        input()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 
 import sys
 from ortools.sat.python import cp_model
-from typing import List, Tuple, Any, Optional
+from typing import Dict, List, Tuple, Any, Optional
 
 
 def add_no_overlap_constraint(
@@ -12,7 +12,8 @@ def add_no_overlap_constraint(
     z: List[cp_model.IntVar],
     l_eff: List[cp_model.IntVar],
     w_eff: List[cp_model.IntVar],
-    h_eff: List[cp_model.IntVar]
+    h_eff: List[cp_model.IntVar],
+    container: Optional[Tuple[int, int, int]] = None
 ) -> None:
     """
     Adds no-overlap constraints for all pairs of boxes in 3D using effective dimensions.
@@ -32,23 +33,121 @@ def add_no_overlap_constraint(
         n: Number of boxes.
         x, y, z: Lists of IntVar, coordinates of the lower corner of each box.
         l_eff, w_eff, h_eff: Lists of IntVar, effective dimensions of each box (depends on orientation).
+        container: Optional container dimensions; when given, redundant cumulative
+            constraints are added as well (see add_redundant_cumulative_constraints).
     """
+    # With the container known, each box end (x + l_eff, ...) gets its own variable, shared
+    # by every pairwise disjunction and by the redundant cumulatives' intervals; the
+    # pairwise constraints then compare two variables instead of re-stating the sum.
+    x_end: List[Any]
+    y_end: List[Any]
+    z_end: List[Any]
+    # Two boxes can only be side by side along an axis if their shortest extents on it
+    # fit in the container together; otherwise both relations on that axis are skipped
+    # (known only with the container; the minima come from the effective-size domains).
+    l_min: List[int] = [0] * n
+    w_min: List[int] = [0] * n
+    h_min: List[int] = [0] * n
+    span: Tuple[float, float, float] = (float('inf'), float('inf'), float('inf'))
+    if container is not None:
+        x_end = [model.NewIntVar(0, container[0], f'x_end_{i}') for i in range(n)]
+        y_end = [model.NewIntVar(0, container[1], f'y_end_{i}') for i in range(n)]
+        z_end = [model.NewIntVar(0, container[2], f'z_end_{i}') for i in range(n)]
+        model_proto = model.Proto()
+        l_min = [model_proto.variables[l_eff[i].Index()].domain[0] for i in range(n)]
+        w_min = [model_proto.variables[w_eff[i].Index()].domain[0] for i in range(n)]
+        h_min = [model_proto.variables[h_eff[i].Index()].domain[0] for i in range(n)]
+        span = container
+    else:
+        x_end = [x[i] + l_eff[i] for i in range(n)]
+        y_end = [y[i] + w_eff[i] for i in range(n)]
+        z_end = [z[i] + h_eff[i] for i in range(n)]
+
     for i in range(n):
         for j in range(i + 1, n):
             no_overlap: List[cp_model.BoolVarT] = []
-            no_overlap.append(model.NewBoolVar(f'i{i}_left_of_j{j}'))
-            model.Add(x[i] + l_eff[i] <= x[j]).OnlyEnforceIf(no_overlap[-1])
-            no_overlap.append(model.NewBoolVar(f'i{i}_right_of_j{j}'))
-            model.Add(x[j] + l_eff[j] <= x[i]).OnlyEnforceIf(no_overlap[-1])
-            no_overlap.append(model.NewBoolVar(f'i{i}_front_of_j{j}'))
-            model.Add(y[i] + w_eff[i] <= y[j]).OnlyEnforceIf(no_overlap[-1])
-            no_overlap.append(model.NewBoolVar(f'i{i}_behind_of_j{j}'))
-            model.Add(y[j] + w_eff[j] <= y[i]).OnlyEnforceIf(no_overlap[-1])
-            no_overlap.append(model.NewBoolVar(f'i{i}_below_j{j}'))
-            model.Add(z[i] + h_eff[i] <= z[j]).OnlyEnforceIf(no_overlap[-1])
-            no_overlap.append(model.NewBoolVar(f'i{i}_above_j{j}'))
-            model.Add(z[j] + h_eff[j] <= z[i]).OnlyEnforceIf(no_overlap[-1])
+            if l_min[i] + l_min[j] <= span[0]:
+                no_overlap.append(model.NewBoolVar(f'i{i}_left_of_j{j}'))
+                model.Add(x_end[i] <= x[j]).OnlyEnforceIf(no_overlap[-1])
+                no_overlap.append(model.NewBoolVar(f'i{i}_right_of_j{j}'))
+                model.Add(x_end[j] <= x[i]).OnlyEnforceIf(no_overlap[-1])
+            if w_min[i] + w_min[j] <= span[1]:
+                no_overlap.append(model.NewBoolVar(f'i{i}_front_of_j{j}'))
+                model.Add(y_end[i] <= y[j]).OnlyEnforceIf(no_overlap[-1])
+                no_overlap.append(model.NewBoolVar(f'i{i}_behind_of_j{j}'))
+                model.Add(y_end[j] <= y[i]).OnlyEnforceIf(no_overlap[-1])
+            if h_min[i] + h_min[j] <= span[2]:
+                no_overlap.append(model.NewBoolVar(f'i{i}_below_j{j}'))
+                model.Add(z_end[i] <= z[j]).OnlyEnforceIf(no_overlap[-1])
+                no_overlap.append(model.NewBoolVar(f'i{i}_above_j{j}'))
+                model.Add(z_end[j] <= z[i]).OnlyEnforceIf(no_overlap[-1])
+            # Empty when the pair fits on no axis: the model is then infeasible, as it should be
             model.AddBoolOr(no_overlap)
+
+    if container is not None:
+        add_redundant_cumulative_constraints(
+            model, n, x, y, z, l_eff, w_eff, h_eff, container, ends=(x_end, y_end, z_end)
+        )
+
+
+def add_redundant_cumulative_constraints(
+    model: cp_model.CpModel,
+    n: int,
+    x: List[cp_model.IntVar],
+    y: List[cp_model.IntVar],
+    z: List[cp_model.IntVar],
+    l_eff: List[cp_model.IntVar],
+    w_eff: List[cp_model.IntVar],
+    h_eff: List[cp_model.IntVar],
+    container: Tuple[int, int, int],
+    ends: Optional[Tuple[List[cp_model.IntVar], List[cp_model.IntVar], List[cp_model.IntVar]]] = None
+) -> None:
+    """
+    Adds redundant cumulative constraints implied by 3D non-overlap.
+
+    A plane orthogonal to an axis crosses the boxes whose interval on that axis contains
+    it, and their cross-sections are disjoint: the sum of those cross-section areas is at
+    most the container's cross-section. Posting this with one interval per box and axis
+    (AddCumulative) lets CP-SAT's global propagators reason on all boxes at once, on top
+    of the exact pairwise disjunctions, which are still required for correctness.
+
+    Args:
+        model: The CpModel instance.
+        n: Number of boxes.
+        x, y, z: Lists of IntVar, coordinates of the lower corner of each box.
+        l_eff, w_eff, h_eff: Lists of IntVar, effective dimensions of each box (depends on orientation).
+        container: Tuple/list of container dimensions (length, width, height).
+        ends: optional (x_end, y_end, z_end) variables to use as interval ends; created
+            here when omitted.
+    """
+    L, W, H = container
+    # Interval ends must be affine: give each one its own variable (the interval
+    # constraint enforces start + size == end)
+    if ends is None:
+        ends = (
+            [model.NewIntVar(0, L, f'x_end_{i}') for i in range(n)],
+            [model.NewIntVar(0, W, f'y_end_{i}') for i in range(n)],
+            [model.NewIntVar(0, H, f'z_end_{i}') for i in range(n)],
+        )
+    x_end, y_end, z_end = ends
+    x_iv = [model.NewIntervalVar(x[i], l_eff[i], x_end[i], f'x_iv_{i}') for i in range(n)]
+    y_iv = [model.NewIntervalVar(y[i], w_eff[i], y_end[i], f'y_iv_{i}') for i in range(n)]
+    z_iv = [model.NewIntervalVar(z[i], h_eff[i], z_end[i], f'z_iv_{i}') for i in range(n)]
+    area_wh: List[cp_model.IntVar] = []
+    area_lh: List[cp_model.IntVar] = []
+    area_lw: List[cp_model.IntVar] = []
+    for i in range(n):
+        area_wh.append(model.NewIntVar(0, W * H, f'area_wh_{i}'))
+        model.AddMultiplicationEquality(area_wh[-1], [w_eff[i], h_eff[i]])
+        area_lh.append(model.NewIntVar(0, L * H, f'area_lh_{i}'))
+        model.AddMultiplicationEquality(area_lh[-1], [l_eff[i], h_eff[i]])
+        area_lw.append(model.NewIntVar(0, L * W, f'area_lw_{i}'))
+        model.AddMultiplicationEquality(area_lw[-1], [l_eff[i], w_eff[i]])
+    model.AddCumulative(x_iv, area_wh, W * H)
+    model.AddCumulative(y_iv, area_lh, L * H)
+    model.AddCumulative(z_iv, area_lw, L * W)
+
+
 def add_inside_container_constraint(
     model: cp_model.CpModel,
     n: int,
@@ -77,6 +176,40 @@ def add_inside_container_constraint(
         model.Add(x[i] + l_eff[i] <= container[0])
         model.Add(y[i] + w_eff[i] <= container[1])
         model.Add(z[i] + h_eff[i] <= container[2])
+def support_candidates(
+    model: cp_model.CpModel,
+    n: int,
+    z: List[cp_model.IntVar],
+    h_eff: List[cp_model.IntVar]
+) -> List[List[int]]:
+    """
+    For each box i, the boxes j != i whose top face can be at the height of i's bottom face.
+
+    Box j can only support box i if the range of j's top (z[j] + h_eff[j]) meets the range
+    of z[i]; both are read from the variable domains, so pairs that can never stack get no
+    support literals at all.
+
+    Args:
+        model: The CpModel instance holding the variables.
+        n: Number of boxes.
+        z: List of IntVar, z-coordinate of the lower face of each box.
+        h_eff: List of IntVar, effective height of each box (depends on orientation).
+
+    Returns:
+        supporters: supporters[i] lists the candidate supporting boxes of box i, in index order.
+    """
+    # (the proto's repeated fields do not support negative indexing, hence the list())
+    model_proto = model.Proto()
+    z_dom: List[List[int]] = [list(model_proto.variables[z[i].Index()].domain) for i in range(n)]
+    h_dom: List[List[int]] = [list(model_proto.variables[h_eff[i].Index()].domain) for i in range(n)]
+    top_min: List[int] = [z_dom[j][0] + h_dom[j][0] for j in range(n)]
+    top_max: List[int] = [z_dom[j][-1] + h_dom[j][-1] for j in range(n)]
+    return [
+        [j for j in range(n) if j != i and top_min[j] <= z_dom[i][-1] and top_max[j] >= z_dom[i][0]]
+        for i in range(n)
+    ]
+
+
 def add_no_floating_constraint(
     model: cp_model.CpModel,
     n: int,
@@ -104,22 +237,34 @@ def add_no_floating_constraint(
     Returns:
         on_floor_vars: List of BoolVar, each is 1 if box i is on the floor, 0 otherwise.
     """
+    supporters: List[List[int]] = support_candidates(model, n, z, h_eff)
+
+    # xy-overlap is symmetric: one literal per unordered pair, shared by "i above j"
+    # and "j above i" (4 reified inequalities per pair instead of 8). Strict overlap is
+    # written in its integer "+ 1 <=" form. Created on first use by a supporting pair.
+    overlap_xy: Dict[Tuple[int, int], cp_model.BoolVarT] = {}
+
+    def get_overlap_xy(i: int, j: int) -> cp_model.BoolVarT:
+        if (i, j) not in overlap_xy:
+            overlap: cp_model.BoolVarT = model.NewBoolVar(f'overlap_xy_{i}_{j}')
+            model.Add(x[i] + 1 <= x[j] + l_eff[j]).OnlyEnforceIf(overlap)
+            model.Add(x[j] + 1 <= x[i] + l_eff[i]).OnlyEnforceIf(overlap)
+            model.Add(y[i] + 1 <= y[j] + w_eff[j]).OnlyEnforceIf(overlap)
+            model.Add(y[j] + 1 <= y[i] + w_eff[i]).OnlyEnforceIf(overlap)
+            overlap_xy[i, j] = overlap
+        return overlap_xy[i, j]
+
     on_floor_vars: List[cp_model.BoolVarT] = []
     for i in range(n):
         on_floor: cp_model.BoolVarT = model.NewBoolVar(f'on_floor_{i}')
         on_floor_vars.append(on_floor)
         model.Add(z[i] == 0).OnlyEnforceIf(on_floor)
         on_another: List[cp_model.BoolVarT] = []
-        for j in range(n):
-            if i == j:
-                continue
+        for j in supporters[i]:
             above: cp_model.BoolVarT = model.NewBoolVar(f'above_{i}_{j}')
             model.Add(z[i] == z[j] + h_eff[j]).OnlyEnforceIf(above)
             # Must overlap in x and y
-            model.Add(x[i] < x[j] + l_eff[j]).OnlyEnforceIf(above)
-            model.Add(x[i] + l_eff[i] > x[j]).OnlyEnforceIf(above)
-            model.Add(y[i] < y[j] + w_eff[j]).OnlyEnforceIf(above)
-            model.Add(y[i] + w_eff[i] > y[j]).OnlyEnforceIf(above)
+            model.AddImplication(above, get_overlap_xy(min(i, j), max(i, j)))
             on_another.append(above)
         model.AddBoolOr([on_floor] + on_another)
     return on_floor_vars
@@ -149,11 +294,13 @@ def apply_anchor_logic(
             model.Add(y[largest_idx] == 0)
             model.Add(z[largest_idx] == 0)
         elif anchormode == 'heavierWithinMostRecurringSimilar':
-            from collections import Counter
-            size_tuples: List[Tuple[int, int, int]] = [tuple(box['size']) for box in boxes]
-            freq: Any = Counter(size_tuples)
-            most_common_size, _ = freq.most_common(1)[0]
-            indices: List[int] = [i for i, box in enumerate(boxes) if tuple(box['size']) == most_common_size]
+            from collections import defaultdict
+            # One pass groups box indices by size; the largest group is the most recurring
+            # size (first seen wins ties, as with Counter.most_common)
+            size_to_indices: Dict[Tuple[int, ...], List[int]] = defaultdict(list)
+            for i, box in enumerate(boxes):
+                size_to_indices[tuple(box['size'])].append(i)
+            indices: List[int] = max(size_to_indices.values(), key=len)
             heaviest_idx: int = max(indices, key=lambda i: boxes[i].get('weight', 0))
             print(f"Anchoring box {heaviest_idx} with size {boxes[heaviest_idx]['size']} and weight {boxes[heaviest_idx].get('weight', 0)}")
             model.Add(x[heaviest_idx] == 0)
@@ -1,3 +1,31 @@
+def get_base_areas(model, n, perms_list, orient):
+    from ortools.sat.python.cp_model import IntVar, Domain
+    from typing import List
+    """
+    Returns one IntVar per box holding the area of its lower face, l_eff[i] * w_eff[i].
+
+    The area is linked to the orientation literals by a single linear equality,
+    sum(orient[i][k] * l_k * w_k), instead of a multiplication, and its domain is the
+    set of bottom areas the allowed orientations can produce. Build it once per model
+    and pass it to the objective terms below that need the base area.
+
+    Args:
+        model: The CpModel instance.
+        n: Number of boxes.
+        perms_list: List of allowed (l, w, h) orientations for each box.
+        orient: List of lists of BoolVar, orient[i][k] is 1 if box i uses perms_list[i][k].
+
+    Returns:
+        base_areas: List of IntVar, base_areas[i] == l_eff[i] * w_eff[i].
+    """
+    base_areas: List[IntVar] = []
+    for i in range(n):
+        bottom_areas: List[int] = [l * w for (l, w, h) in perms_list[i]]
+        base_area: IntVar = model.NewIntVarFromDomain(Domain.FromValues(bottom_areas), f'base_area_{i}')
+        model.Add(base_area == sum(a * o for a, o in zip(bottom_areas, orient[i])))
+        base_areas.append(base_area)
+    return base_areas
+
 def prefer_put_boxes_by_volume_lower_z(model, n, z, l_eff, w_eff, h_eff, container):
     from ortools.sat.python.cp_model import IntVar
     from typing import List
@@ -34,7 +62,7 @@ def prefer_put_boxes_by_volume_lower_z(model, n, z, l_eff, w_eff, h_eff, contain
 
         weighted_terms.append(weighted)
     return weighted_terms
-def prefer_put_boxes_lower_z_non_linear(model, n, z, l_eff, w_eff, container):
+def prefer_put_boxes_lower_z_non_linear(model, n, z, l_eff, w_eff, container, base_areas=None):
     from ortools.sat.python.cp_model import CpModel, IntVar
     from typing import List, Tuple, Any
     """
@@ -51,6 +79,8 @@ def prefer_put_boxes_lower_z_non_linear(model, n, z, l_eff, w_eff, container):
         z: List of IntVar, z[i] is the z-coordinate of the lower face of box i.
         l_eff, w_eff: Lists of IntVar, effective length and width of box i (depends on orientation).
         container: Tuple/list of container dimensions (length, width, height).
+        base_areas: optional shared base area variables from get_base_areas; when given,
+            they replace the l_eff[i] * w_eff[i] factors of the product.
 
     Returns:
         weighted_terms: List of IntVar, each representing (l_eff[i] * w_eff[i]) * (container[2] - z[i]) ** 2
@@ -59,22 +89,19 @@ def prefer_put_boxes_lower_z_non_linear(model, n, z, l_eff, w_eff, container):
     max_base_area: int = container[0] * container[1]
     max_height: int = container[2]
     for i in range(n):
-        base_area: IntVar = model.NewIntVar(0, max_base_area, f'base_area_{i}_ex')
-        model.AddMultiplicationEquality(base_area, [l_eff[i], w_eff[i]])
-
         height_from_bottom: IntVar = model.NewIntVar(0, max_height, f'height_from_bottom_{i}_ex')
         model.Add(height_from_bottom == max_height - z[i])
 
-        height_from_bottom_sq: IntVar = model.NewIntVar(0, max_height * max_height, f'height_from_bottom_sq_{i}_ex')
-        model.AddMultiplicationEquality(height_from_bottom_sq, [height_from_bottom, height_from_bottom])
-
+        # One product of all factors instead of a chain of two-factor products
+        # through base_area and height_from_bottom_sq
+        area_factors = [base_areas[i]] if base_areas is not None else [l_eff[i], w_eff[i]]
         weighted: IntVar = model.NewIntVar(0, max_base_area * max_height * max_height, f'weighted_{i}_ex')
-        model.AddMultiplicationEquality(weighted, [base_area, height_from_bottom_sq])
+        model.AddMultiplicationEquality(weighted, area_factors + [height_from_bottom, height_from_bottom])
 
         weighted_terms.append(weighted)
     return weighted_terms
 
-def prefer_put_boxes_lower_z(model, n, z, l_eff, w_eff, container):
+def prefer_put_boxes_lower_z(model, n, z, l_eff, w_eff, container, base_areas=None):
     from ortools.sat.python.cp_model import CpModel, IntVar
     from typing import List, Tuple, Any
     """
@@ -92,14 +119,19 @@ def prefer_put_boxes_lower_z(model, n, z, l_eff, w_eff, container):
         z: List of IntVar, z[i] is the z-coordinate of the lower face of box i.
         l_eff, w_eff: Lists of IntVar, effective length and width of box i (depends on orientation).
         container: Tuple/list of container dimensions (length, width, height).
+        base_areas: optional shared base area variables from get_base_areas; when given,
+            no per-box base area product is created.
 
     Returns:
         weighted_terms: List of IntVar, each representing (l_eff[i] * w_eff[i]) * (container[2] - z[i])
     """
     weighted_terms: List[IntVar] = []
     for i in range(n):
-        base_area: IntVar = model.NewIntVar(0, container[0] * container[1], f'base_area_{i}')
-        model.AddMultiplicationEquality(base_area, [l_eff[i], w_eff[i]])
+        if base_areas is not None:
+            base_area: IntVar = base_areas[i]
+        else:
+            base_area = model.NewIntVar(0, container[0] * container[1], f'base_area_{i}')
+            model.AddMultiplicationEquality(base_area, [l_eff[i], w_eff[i]])
 
         height_from_bottom: IntVar = model.NewIntVar(0, container[2], f'height_from_bottom_{i}')
         model.Add(height_from_bottom == container[2] - z[i])
@@ -110,7 +142,7 @@ def prefer_put_boxes_lower_z(model, n, z, l_eff, w_eff, container):
         weighted_terms.append(weighted)
     return weighted_terms
 
-def prefer_maximize_surface_contact(model, n, x, y, z, l_eff, w_eff, h_eff,container):
+def prefer_maximize_surface_contact(model, n, x, y, z, l_eff, w_eff, h_eff,container, base_areas=None):
     from ortools.sat.python.cp_model import CpModel, IntVar, BoolVarT
     from typing import List
     """
@@ -129,31 +161,39 @@ def prefer_maximize_surface_contact(model, n, x, y, z, l_eff, w_eff, h_eff,conta
         x, y, z: Lists of IntVar, coordinates of the lower corner of each box.
         l_eff, w_eff, h_eff: Lists of IntVar, effective dimensions of each box (depends on orientation).
         container: Tuple/list of container dimensions (length, width, height).
+        base_areas: optional shared base area variables from get_base_areas.
 
     Returns:
         contact_area_vars: List of IntVar, each representing the total contact area of box i with boxes below.
     """
+    from model_constraints import support_candidates
     contact_area_vars: List[IntVar] = []
     max_area: int = container[0] * container[1]
+    # Only boxes whose top can reach box i's bottom are considered as supports
+    supporters: List[List[int]] = support_candidates(model, n, z, h_eff)
     for i in range(n):
-        contact_with_any: List[IntVar] = []
-        for j in range(n):
-            if i == j:
-                continue
+        on_any: List[BoolVarT] = []
+        for j in supporters[i]:
             is_on_j: BoolVarT = model.NewBoolVar(f'is_on_{i}_on_{j}')
             model.Add(z[i] == z[j] + h_eff[j]).OnlyEnforceIf(is_on_j)
-            model.Add(x[i] < x[j] + l_eff[j]).OnlyEnforceIf(is_on_j)
-            model.Add(x[i] + l_eff[i] > x[j]).OnlyEnforceIf(is_on_j)
-            model.Add(y[i] < y[j] + w_eff[j]).OnlyEnforceIf(is_on_j)
-            model.Add(y[i] + w_eff[i] > y[j]).OnlyEnforceIf(is_on_j)
-            area_ij: IntVar = model.NewIntVar(0, max_area, f'contact_area_{i}_on_{j}')
-            tmp_area: IntVar = model.NewIntVar(0, max_area, f'tmp_contact_area_{i}_on_{j}')
-            model.AddMultiplicationEquality(tmp_area, [l_eff[i], w_eff[i]])
-            model.AddMultiplicationEquality(area_ij, [is_on_j, tmp_area])
-            contact_with_any.append(area_ij)
-        if contact_with_any:
+            model.Add(x[i] + 1 <= x[j] + l_eff[j]).OnlyEnforceIf(is_on_j)
+            model.Add(x[j] + 1 <= x[i] + l_eff[i]).OnlyEnforceIf(is_on_j)
+            model.Add(y[i] + 1 <= y[j] + w_eff[j]).OnlyEnforceIf(is_on_j)
+            model.Add(y[j] + 1 <= y[i] + w_eff[i]).OnlyEnforceIf(is_on_j)
+            on_any.append(is_on_j)
+        if on_any:
+            # Every support contributes box i's full base area, so the sum over j of
+            # is_on_j * area_i is (number of supports) * area_i: one product per box
+            # instead of one contact_area_{i}_on_{j} product per pair
+            if base_areas is not None:
+                tmp_area: IntVar = base_areas[i]
+            else:
+                tmp_area = model.NewIntVar(0, max_area, f'tmp_contact_area_{i}')
+                model.AddMultiplicationEquality(tmp_area, [l_eff[i], w_eff[i]])
+            n_supports: IntVar = model.NewIntVar(0, len(on_any), f'n_supports_{i}')
+            model.Add(n_supports == sum(on_any))
             contact_area_i: IntVar = model.NewIntVar(0, max_area, f'contact_area_{i}')
-            model.Add(contact_area_i == sum(contact_with_any))
+            model.AddMultiplicationEquality(contact_area_i, [n_supports, tmp_area])
             contact_area_vars.append(contact_area_i)
         else:
             contact_area_vars.append(model.NewIntVar(0, 0, f'contact_area_{i}_none'))
@@ -190,26 +230,30 @@ def add_symmetry_breaking_for_identical_boxes(model, boxes, x, y, z, symmetry_mo
 
     axis_vars: List[List[IntVar]] = [x, y, z]
     max_axis: int = max(enumerate(container), key=lambda t: t[1])[0]  # 0=x, 1=y, 2=z
+    # Positions range over 0..container[d], so (x, y, z) maps one-to-one to the integer
+    # x * (W+1) * (H+1) + y * (H+1) + z, whose order is the lexicographic order.
+    stride_y: int = container[2] + 1
+    stride_x: int = (container[1] + 1) * stride_y
 
     for group in identical_boxes_map.values():
         if len(group) < 2:
             continue
 
-        # Apply ordering constraints for each pair within the group
-        for i_idx in range(len(group)):
-            for j_idx in range(i_idx + 1, len(group)):
-                i = group[i_idx]
-                j = group[j_idx]
-                
-                if symmetry_mode == 'simple':
-                    # Simple ordering on one axis
-                    model.Add(axis_vars[max_axis][i] <= axis_vars[max_axis][j])
-                elif symmetry_mode == 'full':
-                    # Full lexicographical ordering using the efficient built-in method
-                    model.AddLexicographicalComparison([x[i], y[i], z[i]], [x[j], y[j], z[j]])
-
-def get_total_floor_area_covered(model, n, on_floor_vars, l_eff, w_eff, container):
-    from ortools.sat.python.cp_model import CpModel, IntVar, BoolVarT
+        # Both orderings are transitive: chaining consecutive boxes of the group is
+        # enough (k - 1 constraints instead of k * (k - 1) / 2)
+        for i, j in zip(group, group[1:]):
+            if symmetry_mode == 'simple':
+                # Simple ordering on one axis
+                model.Add(axis_vars[max_axis][i] <= axis_vars[max_axis][j])
+            elif symmetry_mode == 'full':
+                # Full lexicographical ordering on (x, y, z) as a single linear constraint
+                model.Add(
+                    stride_x * x[i] + stride_y * y[i] + z[i]
+                    <= stride_x * x[j] + stride_y * y[j] + z[j]
+                )
+
+def get_total_floor_area_covered(model, n, on_floor_vars, l_eff, w_eff, container, perms_list=None, orient=None, base_areas=None):
+    from ortools.sat.python.cp_model import CpModel, IntVar, BoolVarT, Domain
     from typing import List
     """
     Returns a list of area variables for each box: on_floor[i] * l_eff[i] * w_eff[i].
@@ -223,12 +267,32 @@ def get_total_floor_area_covered(model, n, on_floor_vars, l_eff, w_eff, containe
         on_floor_vars: List of BoolVar, 1 if box i is on the floor, 0 otherwise.
         l_eff, w_eff: Lists of IntVar, effective length and width of each box (depends on orientation).
         container: Tuple/list of container dimensions (length, width, height).
+        perms_list, orient: optional allowed orientations and their BoolVars. When given,
+            the bottom area is the linear sum of orient[i][k] * (l_k * w_k) and the area is
+            linked to on_floor[i] by two enforced equalities instead of two multiplications.
+        base_areas: optional shared base area variables from get_base_areas; when given,
+            area[i] is tied to base_areas[i] by the same two enforced equalities.
 
     Returns:
         area_vars: List of IntVar, each representing the area of box i on the floor (0 if not on floor).
     """
     max_area: int = container[0] * container[1]
     area_vars: List[IntVar] = []
+    if base_areas is not None:
+        for i in range(n):
+            area_i: IntVar = model.NewIntVar(0, max_area, f'area_on_floor_{i}')
+            model.Add(area_i == base_areas[i]).OnlyEnforceIf(on_floor_vars[i])
+            model.Add(area_i == 0).OnlyEnforceIf(on_floor_vars[i].Not())
+            area_vars.append(area_i)
+        return area_vars
+    if perms_list is not None and orient is not None:
+        for i in range(n):
+            bottom_areas: List[int] = [l * w for (l, w, h) in perms_list[i]]
+            area_i: IntVar = model.NewIntVarFromDomain(Domain.FromValues([0] + bottom_areas), f'area_on_floor_{i}')
+            model.Add(area_i == sum(a * o for a, o in zip(bottom_areas, orient[i]))).OnlyEnforceIf(on_floor_vars[i])
+            model.Add(area_i == 0).OnlyEnforceIf(on_floor_vars[i].Not())
+            area_vars.append(area_i)
+        return area_vars
     for i in range(n):
         area_i: IntVar = model.NewIntVar(0, max_area, f'area_on_floor_{i}')
         tmp: IntVar = model.NewIntVar(0, max_area, f'tmp_{i}')
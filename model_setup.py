@@ -1,13 +1,14 @@
 
 from ortools.sat.python import cp_model
 import sys
-from typing import List, Tuple, Dict, Any
+from typing import List, Optional, Tuple, Dict, Any
 
 # --- Factored out: position variables setup ---
 def create_position_variables(
     model: cp_model.CpModel,
     container: Tuple[int, int, int],
-    boxes: List[Dict[str, Any]]
+    boxes: List[Dict[str, Any]],
+    perms_list: Optional[List[List[Tuple[int, int, int]]]] = None,
 ) -> Tuple[List[cp_model.IntVar], List[cp_model.IntVar], List[cp_model.IntVar]]:
     """
     Create position variables (x, y, z) for n boxes in a container.
@@ -15,15 +16,70 @@ def create_position_variables(
         model: OR-Tools CpModel instance
         container: (L, W, H) tuple for container size
         boxes: list of box dicts
+        perms_list: allowed orientations per box (optional; computed from boxes when omitted)
     Returns:
         x, y, z: lists of IntVar for each box's lower-left-bottom corner
     """
-    n: int = len(boxes)
-    x: List[cp_model.IntVar] = [model.NewIntVar(0, container[0], f'x_{i}') for i in range(n)]
-    y: List[cp_model.IntVar] = [model.NewIntVar(0, container[1], f'y_{i}') for i in range(n)]
-    z: List[cp_model.IntVar] = [model.NewIntVar(0, container[2], f'z_{i}') for i in range(n)]
+    if perms_list is None:
+        perms_list = [allowed_orientations(box, i) for i, box in enumerate(boxes)]
+    cx, cy, cz = container
+    x: List[cp_model.IntVar] = []
+    y: List[cp_model.IntVar] = []
+    z: List[cp_model.IntVar] = []
+    for i, perms in enumerate(perms_list):
+        # A box cannot start closer to the far wall than its smallest extent on that axis
+        # (upper bound clamped at 0 so an oversized box still yields an infeasible model)
+        x.append(model.NewIntVar(0, max(0, cx - min(p[0] for p in perms)), f'x_{i}'))
+        y.append(model.NewIntVar(0, max(0, cy - min(p[1] for p in perms)), f'y_{i}'))
+        z.append(model.NewIntVar(0, max(0, cz - min(p[2] for p in perms)), f'z_{i}'))
     return x, y, z
 
+
+def allowed_orientations(box: Dict[str, Any], i: int) -> List[Tuple[int, int, int]]:
+    """
+    Distinct effective (l, w, h) of the orientations allowed by the box's rotation policy.
+    Orientations giving the same extents (boxes with equal sides; a cube has one) are
+    listed once, in the order of rotation_orientations.
+    Args:
+        box: box dict with 'size' and 'rotation'
+        i: box index (used in error messages when the box has no id)
+    Returns:
+        perms: list of (l, w, h) tuples; index k matches orientation variable k
+    """
+    return list(dict.fromkeys(rotation_orientations(box, i)))
+
+
+def rotation_orientations(box: Dict[str, Any], i: int) -> List[Tuple[int, int, int]]:
+    """
+    Effective (l, w, h) of every orientation of the box's rotation policy, duplicates
+    included: the position in this list is the orientation code reported in placements.
+    Args:
+        box: box dict with 'size' and 'rotation'
+        i: box index (used in error messages when the box has no id)
+    Returns:
+        perms: 1 ('none'), 2 ('z') or 6 ('free') (l, w, h) tuples
+    """
+    l0: int
+    w0: int
+    h0: int
+    l0, w0, h0 = box['size']
+    if 'rotation' not in box:
+        raise ValueError(f"Box {box.get('id', i)} missing required field 'rotation'")
+    rot: str = box['rotation']
+    if rot not in ('none', 'z', 'free'):
+        raise ValueError(f"Invalid rotation value for box {box.get('id', i)}: {rot}. Must be one of ['none','z','free'].")
+    if rot == 'free':
+        return [
+            (l0, w0, h0), (l0, h0, w0), (w0, l0, h0),
+            (w0, h0, l0), (h0, l0, w0), (h0, w0, l0)
+        ]
+    if rot == 'z':
+        return [
+            (l0, w0, h0), (w0, l0, h0)
+        ]
+    # 'none' or unspecified
+    return [(l0, w0, h0)]
+
 def setup_3d_bin_packing_model(
     model: cp_model.CpModel,
     container: Tuple[int, int, int],
@@ -38,24 +94,28 @@ def setup_3d_bin_packing_model(
         orient: orientation variables
         l_eff, w_eff, h_eff: effective dimension variables
     """
+    # Allowed orientations are computed once and shared by both variable factories
+    perms_list: List[List[Tuple[int, int, int]]] = [allowed_orientations(box, i) for i, box in enumerate(boxes)]
     x: List[cp_model.IntVar]
     y: List[cp_model.IntVar]
     z: List[cp_model.IntVar]
-    x, y, z = create_position_variables(model, container, boxes)
+    x, y, z = create_position_variables(model, container, boxes, perms_list)
     n: int = len(boxes)
-    perms_list: List[List[Tuple[int, int, int]]]
     orient: List[List[cp_model.BoolVarT]]
     l_eff: List[cp_model.IntVar]
     w_eff: List[cp_model.IntVar]
     h_eff: List[cp_model.IntVar]
-    perms_list, orient, l_eff, w_eff, h_eff = create_orientation_and_dimension_variables(model, container, boxes)
+    perms_list, orient, l_eff, w_eff, h_eff = create_orientation_and_dimension_variables(
+        model, container, boxes, perms_list
+    )
     return n, x, y, z, perms_list, orient, l_eff, w_eff, h_eff
 
 # --- Factored out: orientation and effective dimension logic ---
 def create_orientation_and_dimension_variables(
     model: cp_model.CpModel,
     container: Tuple[int, int, int],
-    boxes: List[Dict[str, Any]]
+    boxes: List[Dict[str, Any]],
+    perms_list: Optional[List[List[Tuple[int, int, int]]]] = None,
 ) -> Tuple[List[List[Tuple[int, int, int]]], List[List[cp_model.BoolVarT]], List[cp_model.IntVar], List[cp_model.IntVar], List[cp_model.IntVar]]:
     """
     For each box, determine allowed orientations, create orientation variables, and link to effective dimensions.
@@ -63,43 +123,27 @@ def create_orientation_and_dimension_variables(
         model: OR-Tools CpModel instance
         container: (L, W, H) tuple for container size
         boxes: list of box dicts
+        perms_list: allowed orientations per box (optional; computed from boxes when omitted)
     Returns:
         perms_list: list of allowed orientations for each box
         orient: list of lists of BoolVar for each box's orientation
         l_eff, w_eff, h_eff: lists of IntVar for effective dimensions
     """
     n: int = len(boxes)
-    perms_list: List[List[Tuple[int, int, int]]] = []
+    if perms_list is None:
+        perms_list = [allowed_orientations(box, i) for i, box in enumerate(boxes)]
     orient: List[List[cp_model.BoolVarT]] = []
-    for i, box in enumerate(boxes):
-        l0: int
-        w0: int
-        h0: int
-        l0, w0, h0 = box['size']
-        if 'rotation' not in box:
-            raise ValueError(f"Box {box.get('id', i)} missing required field 'rotation'")
-        rot: str = box['rotation']
-        if rot not in ('none', 'z', 'free'):
-            raise ValueError(f"Invalid rotation value for box {box.get('id', i)}: {rot}. Must be one of ['none','z','free'].")
-        perms: List[Tuple[int, int, int]]
-        if rot == 'free':
-            perms = [
-                (l0, w0, h0), (l0, h0, w0), (w0, l0, h0),
-                (w0, h0, l0), (h0, l0, w0), (h0, w0, l0)
-            ]
-        elif rot == 'z':
-            perms = [
-                (l0, w0, h0), (w0, l0, h0)
-            ]
-        else:  # 'none' or unspecified
-            perms = [(l0, w0, h0)]
-        perms_list.append(perms)
+    for i, perms in enumerate(perms_list):
         orient.append([model.NewBoolVar(f'orient_{i}_{k}') for k in range(len(perms))])
         model.Add(sum(orient[-1]) == 1)
 
-    l_eff: List[cp_model.IntVar] = [model.NewIntVar(0, container[0], f'l_eff_{i}') for i in range(n)]
-    w_eff: List[cp_model.IntVar] = [model.NewIntVar(0, container[1], f'w_eff_{i}') for i in range(n)]
-    h_eff: List[cp_model.IntVar] = [model.NewIntVar(0, container[2], f'h_eff_{i}') for i in range(n)]
+    # Effective dimensions range over the discrete set of values their orientations allow
+    def dim_var(values: List[int], name: str) -> cp_model.IntVar:
+        return model.NewIntVarFromDomain(cp_model.Domain.FromValues(sorted(set(values))), name)
+
+    l_eff: List[cp_model.IntVar] = [dim_var([p[0] for p in perms_list[i]], f'l_eff_{i}') for i in range(n)]
+    w_eff: List[cp_model.IntVar] = [dim_var([p[1] for p in perms_list[i]], f'w_eff_{i}') for i in range(n)]
+    h_eff: List[cp_model.IntVar] = [dim_var([p[2] for p in perms_list[i]], f'h_eff_{i}') for i in range(n)]
 
     for i in range(n):
         for k, (l, w, h) in enumerate(perms_list[i]):
@@ -54,13 +54,16 @@ def dump_phase1_results(
         container_weight: Maximum weight per container
         verbose: Whether to print detailed output
     """
-    print_if_verbose = create_print_if_verbose(verbose)
     
     num_items = len(items)
-    item_ids = [item.get('id', i+1) for i, item in enumerate(items)]
-    item_weights = [item['weight'] for item in items]
-    item_volumes = [item['size'][0] * item['size'][1] * item['size'][2] for item in items]
-    item_group_ids = [item.get('group_id') for item in items]
+    # One pass over the items for all the per-item columns
+    item_ids, item_weights, item_volumes, item_group_ids = [], [], [], []
+    for i, item in enumerate(items):
+        size = item['size']
+        item_ids.append(item.get('id', i+1))
+        item_weights.append(item['weight'])
+        item_volumes.append(size[0] * size[1] * size[2])
+        item_group_ids.append(item.get('group_id'))
     container_volume = container_size[0] * container_size[1] * container_size[2]
     if container_volume <= 0:
         raise ValueError(f"Invalid container volume: {container_volume}. Container dimensions: {container_size}")
@@ -90,26 +93,34 @@ def dump_phase1_results(
         print(f'Total group splits (penalized): {total_group_splits}')
         used_container_indices = [j for j in range(max_containers) if solver.Value(y[j])]
         container_rebase = {old_idx: new_idx+1 for new_idx, old_idx in enumerate(used_container_indices)}
+        # Read the assignment from the solver once; everything below derives from it
+        items_by_container = {j: [] for j in used_container_indices}
+        for i in range(num_items):
+            for j in used_container_indices:
+                if solver.Value(x[i, j]):
+                    items_by_container[j].append(i)
  
-        total_boxes_weight_check = sum(item_weights[i] for j in used_container_indices for i in range(num_items) if solver.Value(x[i, j]))  
-        total_boxes_volume_check = sum(item_volumes[i] for j in used_container_indices for i in range(num_items) if solver.Value(x[i, j]))
+        total_boxes_weight_check = sum(item_weights[i] for members in items_by_container.values() for i in members)
+        total_boxes_volume_check = sum(item_volumes[i] for members in items_by_container.values() for i in members)
         total_container_boxes = 0
  
         for old_j in used_container_indices:
             new_j = container_rebase[old_j]
-            items_in_container = [i for i in range(num_items) if solver.Value(x[i, old_j])]
+            items_in_container = items_by_container[old_j]
             total_weight = sum(item_weights[i] for i in items_in_container)
             total_volume = sum(item_volumes[i] for i in items_in_container)
-            container_boxes = [items[i] for i in items_in_container]
-            total_container_boxes += len(container_boxes)
+            total_container_boxes += len(items_in_container)
             pct_weight = 100 * total_weight / container_weight if container_weight > 0 else 0
             pct_volume = 100 * total_volume / container_volume if container_volume > 0 else 0
-            print_if_verbose('')
-            print_if_verbose(f'### Container {new_j}')
-            print_if_verbose('| Item id | Weight | Volume | Group id |')
-            
-            for i in items_in_container:
-                print_if_verbose(f'| {item_ids[i]} | {item_weights[i]} | {item_volumes[i]} | {item_group_ids[i]} |')
+            if verbose:
+                # Whole markdown table in one write; rows are only formatted when shown
+                print('\n'.join([
+                    '',
+                    f'### Container {new_j}',
+                    '| Item id | Weight | Volume | Group id |',
+                    *(f'| {item_ids[i]} | {item_weights[i]} | {item_volumes[i]} | {item_group_ids[i]} |'
+                      for i in items_in_container),
+                ]))
             print(f'**Total for container {new_j}: total items {len(items_in_container)} weight = {total_weight} ({pct_weight:.1f}% of max), volume = {total_volume} ({pct_volume:.1f}% of max)**')
 
         print(f'Total boxes weight check: {total_boxes_weight_check}')
@@ -117,17 +128,18 @@ def dump_phase1_results(
         print(f'Total container boxes: {total_container_boxes}')            
         
         if group_ids:
-            print_if_verbose('')
-            print_if_verbose('### Group Splits')
-            print_if_verbose('| Group id | Containers used | Splits (penalized) | Container numbers |')
-            print_if_verbose('|----------|----------------|--------------------|-------------------|')
-            for g in group_ids:
-                containers_for_group = []
-                for old_j in used_container_indices:
-                    if any(solver.Value(x[i, old_j]) for i in group_to_items[g]):
-                        containers_for_group.append(str(container_rebase[old_j]))
-                containers_str = ', '.join(containers_for_group)
-                print_if_verbose(f'| {g} | {solver.Value(group_in_containers[g])} | {group_splits[g]} | {containers_str} |')
+            if verbose:
+                container_of = {i: old_j for old_j, members in items_by_container.items() for i in members}
+                rows = ['', '### Group Splits',
+                        '| Group id | Containers used | Splits (penalized) | Container numbers |',
+                        '|----------|----------------|--------------------|-------------------|']
+                for g in group_ids:
+                    group_containers = {container_of[i] for i in group_to_items[g] if i in container_of}
+                    containers_str = ', '.join(
+                        str(container_rebase[old_j]) for old_j in used_container_indices if old_j in group_containers
+                    )
+                    rows.append(f'| {g} | {solver.Value(group_in_containers[g])} | {group_splits[g]} | {containers_str} |')
+                print('\n'.join(rows))
             print('')
     else:
         print('No solution found.')
@@ -22,4 +22,5 @@ if [ ${#} -ge 2 ]; then OUTPUT_PATH="$2"; fi
 "${PYBIN}" "${ROOT_DIR}/main.py" \
   --input "${INPUT_PATH}" \
   --output "${OUTPUT_PATH}" \
-  --verbose
+  --verbose \
+  --visualize
@@ -1,7 +1,8 @@
 """
 Shared CP-SAT assignment model for container loading (step 1 and ALNS repair)
 """
-from typing import Any, Dict, List, Optional, Tuple
+from itertools import chain
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from ortools.sat.python import cp_model
 
 def build_step1_model(
@@ -14,6 +15,9 @@ def build_step1_model(
     group_penalty_lambda: float = 1.0,
     volume_balance_lambda: float = 0.1,
     dump_inputs: bool = False,
+    precomputed_volumes: Optional[Sequence[int]] = None,
+    precomputed_weights: Optional[Sequence[Any]] = None,
+    symmetry_breaking_from: Optional[int] = 0,
 ):
     """
     items: list of item dicts (must have 'id', 'size', 'weight', optional 'group_id')
@@ -23,7 +27,14 @@ def build_step1_model(
     group_to_items: dict mapping group_id to list of item indices (optional)
     fixed_assignments: dict {item_id: container_idx} for items to fix (optional)
     group_penalty_lambda: penalty weight for group splits
-    volume_balance_lambda: penalty weight for volume imbalance between containers
+    volume_balance_lambda: penalty weight for the volume spread between used containers
+    precomputed_volumes / precomputed_weights: per-item volumes and weights, aligned
+        with items (optional; computed from items when omitted)
+    symmetry_breaking_from: containers j >= this index start empty and are
+        interchangeable (same size and weight): they are used in index order. When 0 and
+        no assignment is fixed, item i is also restricted to containers 0..i and
+        identical items are placed in non-decreasing container order. None disables
+        symmetry breaking.
     Returns: model, x, y, group_in_containers, group_ids
     """
     if dump_inputs:
@@ -32,25 +43,57 @@ def build_step1_model(
         print(f'Container volume capacity: {container_size[0] * container_size[1] * container_size[2]}')
         print(f'Container weight capacity: {container_weight}')
         print(f'number of items: {len(items)} total weight: {sum(item["weight"] for item in items)} total volume: {sum(item["size"][0] * item["size"][1] * item["size"][2] for item in items)}')
-        print('Item details:')
-        for i, item in enumerate(items):
-            volume = item['size'][0] * item['size'][1] * item['size'][2]
-            rotation = item.get('rotation', None)
-            group_id = item.get('group_id', None)
-            print(f'Counter {i} Item id {item["id"]}: weight={item["weight"]}, volume={volume}, rotation={rotation}, group_id={group_id}')
-        print('****************')
+        print('\n'.join([
+            'Item details:',
+            *(f'Counter {i} Item id {item["id"]}: weight={item["weight"]}, '
+              f'volume={item["size"][0] * item["size"][1] * item["size"][2]}, '
+              f'rotation={item.get("rotation", None)}, group_id={item.get("group_id", None)}'
+              for i, item in enumerate(items)),
+            '****************',
+        ]))
     
     model: cp_model.CpModel = cp_model.CpModel()
     
     num_items: int = len(items)
     container_capacity_volume: int = container_size[0] * container_size[1] * container_size[2]
+    # Item volumes computed once (or supplied by the caller) and reused by the capacity
+    # and volume-used constraints
+    volumes: List[int] = (
+        list(precomputed_volumes) if precomputed_volumes is not None
+        else [item['size'][0] * item['size'][1] * item['size'][2] for item in items]
+    )
     
     # Variables
+    # The model is rebuilt on every ALNS repair: the per-item/per-container variables are
+    # anonymous (empty names) to skip building num_items * max_containers name strings.
+    # With all containers interchangeable, any solution can be relabelled so that each
+    # container's lowest item index is >= its own index: x[i, j] for j > i is then 0.
+    item_lex: bool = symmetry_breaking_from == 0 and not fixed_assignments
     x: Dict[Tuple[int, int], cp_model.IntVar] = {}  # BoolVar; x[i, j] = 1 if item i in container j
     for i in range(num_items):
         for j in range(max_containers):
-            x[i, j] = model.NewBoolVar(f'x_{i}_{j}')
-    y: List[cp_model.IntVar] = [model.NewBoolVar(f'y_{j}') for j in range(max_containers)]
+            x[i, j] = model.NewConstant(0) if item_lex and j > i else model.NewBoolVar('')
+    y: List[cp_model.IntVar] = [model.NewBoolVar('') for j in range(max_containers)]
+    if symmetry_breaking_from is not None:
+        # Interchangeable containers are opened in index order
+        for j in range(symmetry_breaking_from, max_containers - 1):
+            model.AddImplication(y[j + 1], y[j])
+    if item_lex:
+        # Identical items (same size, weight, group and rotation) are interchangeable:
+        # chain them so that container indices are non-decreasing along each class.
+        # Compatible with the x[i, j] == 0 (j > i) restriction above: the
+        # lexicographically smallest container vector of any solution satisfies both.
+        last_of_class: Dict[Any, int] = {}
+        container_indices: List[int] = list(range(max_containers))
+        for i, item in enumerate(items):
+            key = (tuple(item['size']), item['weight'], item.get('group_id'), item.get('rotation'))
+            prev = last_of_class.get(key)
+            if prev is not None:
+                model.Add(
+                    cp_model.LinearExpr.WeightedSum([x[prev, j] for j in range(max_containers)], container_indices)
+                    <= cp_model.LinearExpr.WeightedSum([x[i, j] for j in range(max_containers)], container_indices)
+                )
+            last_of_class[key] = i
     # Constraints
     for i in range(num_items):
         if fixed_assignments and items[i]['id'] in fixed_assignments:
@@ -63,12 +106,25 @@ def build_step1_model(
                     model.Add(x[i, j] == 0)
         else:
             model.Add(sum(x[i, j] for j in range(max_containers)) == 1)
+    # Linear sums are built with LinearExpr.WeightedSum (one call) rather than Python sum()
+    weights: List[Any] = (
+        list(precomputed_weights) if precomputed_weights is not None
+        else [item['weight'] for item in items]
+    )
     for j in range(max_containers):
-        model.Add(sum(items[i]['size'][0]*items[i]['size'][1]*items[i]['size'][2] * x[i, j] for i in range(num_items)) <= container_size[0]*container_size[1]*container_size[2] * y[j])
-        model.Add(sum(items[i]['weight'] * x[i, j] for i in range(num_items)) <= container_weight * y[j])
-    for j in range(max_containers):
-        for i in range(num_items):
-            model.Add(x[i, j] <= y[j])
+        column: List[cp_model.IntVar] = [x[i, j] for i in range(num_items)]
+        model.Add(cp_model.LinearExpr.WeightedSum(column, volumes) <= container_capacity_volume * y[j])
+        model.Add(cp_model.LinearExpr.WeightedSum(column, weights) <= container_weight * y[j])
+    # x[i, j] <= y[j] is implied by the volume capacity constraint for any item with a
+    # positive volume; only channel explicitly the (degenerate) zero-volume items, with
+    # one aggregated constraint per container.
+    zero_volume_items: List[int] = [i for i in range(num_items) if volumes[i] <= 0]
+    if zero_volume_items:
+        for j in range(max_containers):
+            model.Add(
+                cp_model.LinearExpr.Sum([x[i, j] for i in zero_volume_items])
+                <= len(zero_volume_items) * y[j]
+            )
     # Soft grouping
     group_in_j: Dict[Tuple[Any, int], cp_model.IntVar] = {}  # kept for readability
     group_in_containers: Dict[Any, cp_model.IntVar] = {}
@@ -77,43 +133,35 @@ def build_step1_model(
         assert group_to_items is not None
         for g in group_ids:
             for j in range(max_containers):
-                group_in_j[g, j] = model.NewBoolVar(f'group_{g}_in_{j}')
+                group_in_j[g, j] = model.NewBoolVar('')
                 item_vars = [x[i, j] for i in group_to_items[g]]
                 model.AddMaxEquality(group_in_j[g, j], item_vars)
             group_in_containers[g] = model.NewIntVar(1, max_containers, f'group_{g}_num_containers')
             model.Add(group_in_containers[g] == sum(group_in_j[g, j] for j in range(max_containers)))
     
-    # Volume balance variables and constraints (Pairwise approach)
+    # Volume balance variables and constraints
     container_volume_used: Dict[int, cp_model.IntVar] = {}
     for j in range(max_containers):
         container_volume_used[j] = model.NewIntVar(0, container_capacity_volume, f'vol_used_{j}')
-        model.Add(container_volume_used[j] == sum(
-            items[i]['size'][0] * items[i]['size'][1] * items[i]['size'][2] * x[i, j] 
-            for i in range(num_items)
+        model.Add(container_volume_used[j] == cp_model.LinearExpr.WeightedSum(
+            [x[i, j] for i in range(num_items)], volumes
         ))
     
-    # Pairwise volume balance penalties
-    pairwise_penalties: List[cp_model.IntVar] = []
-    for j1 in range(max_containers):
-        for j2 in range(j1 + 1, max_containers):
-            diff_var = model.NewIntVar(0, container_capacity_volume, f'diff_{j1}_{j2}')
-            both_used = model.NewBoolVar(f'both_used_{j1}_{j2}')
-            
-            # both_used is true only if both containers are used
-            model.AddBoolAnd([y[j1], y[j2]]).OnlyEnforceIf(both_used)
-            model.AddBoolOr([y[j1].Not(), y[j2].Not()]).OnlyEnforceIf(both_used.Not())
-            
-            # Calculate absolute difference only if both containers are used
-            model.Add(diff_var >= container_volume_used[j1] - container_volume_used[j2]).OnlyEnforceIf(both_used)
-            model.Add(diff_var >= container_volume_used[j2] - container_volume_used[j1]).OnlyEnforceIf(both_used)
-            model.Add(diff_var == 0).OnlyEnforceIf(both_used.Not())
-            
-            pairwise_penalties.append(diff_var)
-    
+    # Volume balance penalty: spread between the fullest and the emptiest used container.
+    # O(max_containers) instead of pairwise differences; unused containers are lifted to
+    # full capacity in the min term so they do not drag the minimum down to zero.
+    max_volume_used: cp_model.IntVar = model.NewIntVar(0, container_capacity_volume, 'max_vol_used')
+    min_volume_used: cp_model.IntVar = model.NewIntVar(0, container_capacity_volume, 'min_vol_used')
+    model.AddMaxEquality(max_volume_used, [container_volume_used[j] for j in range(max_containers)])
+    model.AddMinEquality(
+        min_volume_used,
+        [container_volume_used[j] + container_capacity_volume * (1 - y[j]) for j in range(max_containers)],
+    )
+
     # Objective
     # Objective
     group_split_penalty = sum(group_in_containers[g] - 1 for g in group_ids) if group_ids else 0
-    volume_balance_penalty = sum(pairwise_penalties) if pairwise_penalties else 0
+    volume_balance_penalty = max_volume_used - min_volume_used
     
     model.Minimize(
         sum(y[j] for j in range(max_containers)) +  # Minimize number of containers
@@ -121,3 +169,87 @@ def build_step1_model(
         volume_balance_lambda * volume_balance_penalty  # Volume balance penalty
     )
     return model, x, y, group_in_containers, group_ids
+
+
+def first_fit_decreasing(
+    items: List[Dict[str, Any]],
+    container_size: List[int],
+    container_weight: float,
+) -> List[int]:
+    """
+    Greedy step 1 assignment, used to bound max_containers before building the model.
+    Items are taken by decreasing max(volume share, weight share) of a container and
+    go to the first container with room for both, trying containers that already
+    hold the item's group_id first.
+    Returns: container index per item (-1 if the item does not fit an empty container),
+    with containers numbered by their lowest item index, the order that the symmetry
+    breaking of build_step1_model expects.
+    """
+    cap_volume: int = container_size[0] * container_size[1] * container_size[2]
+    volumes: List[int] = [item['size'][0] * item['size'][1] * item['size'][2] for item in items]
+    order: List[int] = sorted(
+        range(len(items)),
+        key=lambda i: max(volumes[i] / cap_volume, items[i]['weight'] / container_weight),
+        reverse=True,
+    )
+    bins: List[int] = [-1] * len(items)
+    volume_used: List[int] = []
+    weight_used: List[float] = []
+    group_bins: Dict[Any, List[int]] = {}
+    # Smallest volume / weight among the items not placed yet: a container with less room
+    # than that can take nothing more and drops out of the first-fit scan
+    min_volume_after: List[float] = [float('inf')] * (len(order) + 1)
+    min_weight_after: List[float] = [float('inf')] * (len(order) + 1)
+    for pos in range(len(order) - 1, -1, -1):
+        min_volume_after[pos] = min(min_volume_after[pos + 1], volumes[order[pos]])
+        min_weight_after[pos] = min(min_weight_after[pos + 1], items[order[pos]]['weight'])
+    open_bins: List[int] = []  # containers that may still take an item, in index order
+    for pos, i in enumerate(order):
+        v, w, gid = volumes[i], items[i]['weight'], items[i].get('group_id')
+        if v > cap_volume or w > container_weight:
+            continue
+        preferred: List[int] = group_bins.get(gid, []) if gid is not None else []
+        for b in chain(preferred, open_bins):
+            if volume_used[b] + v <= cap_volume and weight_used[b] + w <= container_weight:
+                break
+        else:
+            b = len(volume_used)
+            volume_used.append(0)
+            weight_used.append(0.0)
+            open_bins.append(b)
+        bins[i] = b
+        volume_used[b] += v
+        weight_used[b] += w
+        if gid is not None and b not in group_bins.setdefault(gid, []):
+            group_bins[gid].append(b)
+        if (cap_volume - volume_used[b] < min_volume_after[pos + 1]
+                or container_weight - weight_used[b] < min_weight_after[pos + 1]) and b in open_bins:
+            open_bins.remove(b)
+    # Renumber containers by first appearance in item order
+    relabel: Dict[int, int] = {}
+    for b in bins:
+        if b >= 0 and b not in relabel:
+            relabel[b] = len(relabel)
+    return [relabel[b] if b >= 0 else -1 for b in bins]
+
+
+def step1_objective(
+    items: List[Dict[str, Any]],
+    bins: List[int],
+    group_to_items: Optional[Dict[Any, List[int]]] = None,
+    group_penalty_lambda: float = 1.0,
+    volume_balance_lambda: float = 0.1,
+) -> float:
+    """
+    Value of the build_step1_model objective for a complete assignment
+    (bins[i] = container index of item i).
+    """
+    volume_used: Dict[int, int] = {}
+    for item, b in zip(items, bins):
+        volume_used[b] = volume_used.get(b, 0) + item['size'][0] * item['size'][1] * item['size'][2]
+    group_splits: int = sum(
+        len({bins[i] for i in members}) - 1 for members in (group_to_items or {}).values()
+    )
+    spread: int = max(volume_used.values()) - min(volume_used.values()) if volume_used else 0
+    return len(volume_used) + group_penalty_lambda * group_splits + volume_balance_lambda * spread
+
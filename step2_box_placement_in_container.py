@@ -11,8 +11,8 @@ Note: We intentionally keep behavior unchanged; this file is annotated with
 types and comments for clarity and maintainability.
 """
 
-import json
 from ortools.sat.python import cp_model
+from load_utils import load_json_cached
 from typing import Any, Dict, List, Tuple, Optional, TypedDict, Literal, Sequence, cast
 
 
@@ -31,11 +31,23 @@ class BoxDict(TypedDict):
     rotation: Literal['none', 'z', 'free']
 
 
+def configure_solver_for_packing(solver: cp_model.CpSolver) -> None:
+    """Parameter preset for the 3D placement model (opt-in via solver_phase2_packing_preset)."""
+    solver.parameters.linearization_level = 2
+    solver.parameters.cp_model_presolve = True
+    solver.parameters.cp_model_probing_level = 2
+    solver.parameters.use_phase_saving = True
+    solver.parameters.optimize_with_core = False
+    solver.parameters.search_branching = cp_model.PORTFOLIO_WITH_QUICK_RESTART_SEARCH
+
+
 def run_phase_2(
     container: ContainerDict,
     boxes: List[BoxDict],
     settingsfile: str,
     verbose: bool = True,
+    num_workers: Optional[int] = None,
+    hints: Optional[Dict[Any, Tuple[Sequence[int], int]]] = None,
 ) -> Tuple[str, Dict[str, Any]]:
     """Run phase 2: place boxes inside a single container using CP-SAT.
 
@@ -58,9 +70,14 @@ def run_phase_2(
             least an "id" and a "size" triple [l, w, h]. Optional fields like
             "rotation" control allowed orientations.
         settingsfile: Path to a JSON file containing solver and preference
-            parameters (e.g., symmetry_mode, max_time_in_seconds, anchor_mode,
+            parameters (e.g., symmetry_mode, max_time_in_seconds,
+            solver_phase2_num_workers, log_search_progress, anchor_mode,
             and preference weights).
         verbose: If True, print diagnostic information.
+        num_workers: If given, overrides solver_phase2_num_workers from the settings
+            (callers solving several containers in parallel pass 1).
+        hints: Optional warm start, box id -> (position, orientation index) from an
+            earlier placement of that box; passed to CP-SAT as solution hints.
     visualize: Deprecated. Visualization is now handled by the caller.
 
     Returns:
@@ -70,10 +87,11 @@ def run_phase_2(
             - step2_results: Dict with information to reproduce visualization and
                 analysis (elapsed_time, perms_list, placements, status_str).
               Note: placements are included inside step2_results to avoid duplication.
+              When a solution is found, placements[i] corresponds to boxes[i]
+              (input order is preserved); otherwise placements is empty.
     """
-    # Load settings from the JSON file
-    with open(settingsfile, 'r') as f:
-        data = json.load(f)
+    # Load settings from the JSON file (parsed once, reused while the file is unchanged)
+    data = load_json_cached(settingsfile)
 
     # Validate and normalize container input (must be dict with size)
     if not isinstance(container, dict):
@@ -91,6 +109,10 @@ def run_phase_2(
     prefer_total_floor_area_weight = data.get('prefer_total_floor_area_weight', 0)  # default 0 for backward compatibility
     prefer_large_base_lower_non_linear_weight = data.get('prefer_large_base_lower_non_linear_weight', 0)  # default 0
     prefer_put_boxes_by_volume_lower_z_weight = data.get('prefer_put_boxes_by_volume_lower_z_weight', 0)  # default 0
+    if num_workers is None:
+        num_workers = data.get('solver_phase2_num_workers', 8)
+    log_search_progress = data.get('log_search_progress', False)
+    packing_preset = data.get('solver_phase2_packing_preset', False)
     status_str, step2_results = run_inner(
         container_size, boxes, symmetry_mode, solver_phase2_max_time_in_seconds, anchor_mode,
         prefer_orientation_where_side_with_biggest_surface_is_at_the_bottom_weight,
@@ -99,7 +121,11 @@ def run_phase_2(
         prefer_total_floor_area_weight,
         prefer_large_base_lower_non_linear_weight,
         prefer_put_boxes_by_volume_lower_z_weight,
-        verbose)
+        verbose,
+        num_workers=num_workers,
+        log_search_progress=log_search_progress,
+        hints=hints,
+        packing_preset=packing_preset)
     return status_str, step2_results
 
 def run_inner(
@@ -115,6 +141,10 @@ def run_inner(
     prefer_large_base_lower_non_linear_weight: int,
     prefer_put_boxes_by_volume_lower_z_weight: int,
     verbose: bool = False,
+    num_workers: int = 8,
+    log_search_progress: bool = False,
+    hints: Optional[Dict[Any, Tuple[Sequence[int], int]]] = None,
+    packing_preset: bool = False,
 ) -> Tuple[str, Dict[str, Any]]:
     """Builds and solves the 3D box placement CP-SAT model for one container.
 
@@ -150,6 +180,12 @@ def run_inner(
         prefer_put_boxes_by_volume_lower_z_weight: Weight to prefer larger
             volume boxes at lower z.
         verbose: If True, prints diagnostic information.
+        num_workers: Number of parallel CP-SAT search workers (portfolio).
+        log_search_progress: If True, CP-SAT logs its search (including the
+            portfolio of worker strategies).
+        hints: Optional mapping box id -> (position, orientation index) used as
+            CP-SAT solution hints; boxes without an entry are left unhinted.
+        packing_preset: If True, apply configure_solver_for_packing to the solver.
     visualize: Deprecated. No internal visualization is performed.
 
         Returns:
@@ -184,7 +220,7 @@ def run_inner(
 
 
     model = cp_model.CpModel()
-    from model_setup import setup_3d_bin_packing_model
+    from model_setup import setup_3d_bin_packing_model, rotation_orientations
     # Decision variables and effective dimensions per item/orientation are
     # created by the model setup. See cp_model reference for IntVar/BoolVar.
     # https://developers.google.com/optimization/reference/python/sat/python/cp_model#IntVar
@@ -195,27 +231,31 @@ def run_inner(
     n, x, y, z, perms_list, orient, l_eff, w_eff, h_eff = setup_3d_bin_packing_model(model, container_t, boxes_for_model)
     import time
     solver = cp_model.CpSolver()
-    #if verbose:
-     #   solver.parameters.log_search_progress = True
+    solver.parameters.num_workers = num_workers
+    solver.parameters.log_search_progress = log_search_progress
+    if packing_preset:
+        configure_solver_for_packing(solver)
 
 
 
     from model_constraints import add_no_overlap_constraint, apply_anchor_logic
    
     # Non-overlap between all placed boxes (disjunctive in 3D)
-    add_no_overlap_constraint(model, n, x, y, z, l_eff, w_eff, h_eff)
+    # (plus redundant cumulative constraints on each axis)
+    add_no_overlap_constraint(model, n, x, y, z, l_eff, w_eff, h_eff, container_t)
 
 
-    from model_constraints import add_inside_container_constraint
-    # Keep every box fully inside the container bounds
-    add_inside_container_constraint(model, n, x, y, z, l_eff, w_eff, h_eff, container_t)
+    # Every box stays inside the container through its variable domains: the box end
+    # variables created above range over [0, L/W/H] and their intervals enforce
+    # x + l_eff == x_end (and y, z likewise), so add_inside_container_constraint
+    # would only restate them.
 
 
     # Anchor logic based on anchormode
     apply_anchor_logic(model, anchor_mode, boxes_local, x, y, z)
 
 
-    from model_optimizations import prefer_put_boxes_by_volume_lower_z, add_symmetry_breaking_for_identical_boxes,prefer_put_boxes_lower_z, prefer_put_boxes_lower_z_non_linear, get_total_floor_area_covered, prefer_orientation_where_side_with_biggest_surface_is_at_the_bottom, prefer_maximize_surface_contact
+    from model_optimizations import get_base_areas, prefer_put_boxes_by_volume_lower_z, add_symmetry_breaking_for_identical_boxes,prefer_put_boxes_lower_z, prefer_put_boxes_lower_z_non_linear, get_total_floor_area_covered, prefer_orientation_where_side_with_biggest_surface_is_at_the_bottom, prefer_maximize_surface_contact
 
     # Symmetry breaking for identical boxes (same size and allowed rotations)
     add_symmetry_breaking_for_identical_boxes(model, boxes_local, x, y, z, symmetry_mode, container_t)
@@ -228,15 +268,22 @@ def run_inner(
     # Soft constraints
     terms = []
 
+    # Base areas (l_eff * w_eff) are built once, from the orientation literals, and shared
+    # by every soft constraint that needs them
+    base_areas = None
+    if (prefer_total_floor_area_weight or prefer_maximize_surface_contact_weight
+            or prefer_large_base_lower_weight or prefer_large_base_lower_non_linear_weight):
+        base_areas = get_base_areas(model, n, perms_list, orient)
+
     
 
     if prefer_total_floor_area_weight:
         # Maximize total covered floor area (as a soft constraint with weight)
-        area_vars = get_total_floor_area_covered(model, n, on_floor_vars, l_eff, w_eff, container_t)
+        area_vars = get_total_floor_area_covered(model, n, on_floor_vars, l_eff, w_eff, container_t, perms_list, orient, base_areas)
         terms.append(prefer_total_floor_area_weight * sum(area_vars))
         
     if prefer_maximize_surface_contact_weight:
-        contact_area_vars = prefer_maximize_surface_contact(model, n, x, y, z, l_eff, w_eff, h_eff, container_t)
+        contact_area_vars = prefer_maximize_surface_contact(model, n, x, y, z, l_eff, w_eff, h_eff, container_t, base_areas)
         gamma = prefer_maximize_surface_contact_weight
         terms.append(gamma * sum(contact_area_vars))    
 
@@ -246,11 +293,11 @@ def run_inner(
         terms.append(beta * sum(preferred_orient_vars))
     
     if prefer_large_base_lower_weight:
-        weighted_terms = prefer_put_boxes_lower_z(model, n, z, l_eff, w_eff, container_t)
+        weighted_terms = prefer_put_boxes_lower_z(model, n, z, l_eff, w_eff, container_t, base_areas)
         delta = prefer_large_base_lower_weight
         terms.append(delta * sum(weighted_terms))
     if prefer_large_base_lower_non_linear_weight:
-        weighted_terms_nl = prefer_put_boxes_lower_z_non_linear(model, n, z, l_eff, w_eff, container_t)
+        weighted_terms_nl = prefer_put_boxes_lower_z_non_linear(model, n, z, l_eff, w_eff, container_t, base_areas)
         delta_nl = prefer_large_base_lower_non_linear_weight
         terms.append(delta_nl * sum(weighted_terms_nl))
     if prefer_put_boxes_by_volume_lower_z_weight:
@@ -263,6 +310,25 @@ def run_inner(
     model.Maximize(sum(terms))
 
 
+    # Warm start: boxes placed before (e.g. in the previous ALNS state) keep their
+    # position and orientation as hints; CP-SAT completes or repairs the rest.
+    if hints:
+        for i, box in enumerate(boxes_local):
+            hint = hints.get(box.get('id'))
+            codes = rotation_orientations(box, i)
+            if hint is None or hint[1] is None or not 0 <= hint[1] < len(codes):
+                continue
+            (hx, hy, hz), code = hint
+            k = perms_list[i].index(codes[code])
+            model.AddHint(x[i], hx)
+            model.AddHint(y[i], hy)
+            model.AddHint(z[i], hz)
+            for kk, orient_var in enumerate(orient[i]):
+                model.AddHint(orient_var, kk == k)
+            model.AddHint(l_eff[i], perms_list[i][k][0])
+            model.AddHint(w_eff[i], perms_list[i][k][1])
+            model.AddHint(h_eff[i], perms_list[i][k][2])
+
     # Solve
     # Time limit helps keep search bounded for larger instances.
     solver.parameters.max_time_in_seconds = solver_phase2_max_time_in_seconds
@@ -299,12 +365,16 @@ def run_inner(
 
     placements = []
     if status == cp_model.FEASIBLE or status == cp_model.OPTIMAL:
+        # Whole solution vector in one call instead of one solver.Value per variable
+        solution = solver.ResponseProto().solution
         for i in range(n):
             # Find which orientation is selected
-            orient_val = [solver.Value(orient[i][k]) for k in range(len(orient[i]))]
-            orient_idx = orient_val.index(1) if 1 in orient_val else None
-            l, w, h = perms_list[i][orient_idx] if orient_idx is not None else (None, None, None)
-            pos = (solver.Value(x[i]), solver.Value(y[i]), solver.Value(z[i])) if orient_idx is not None else (None, None, None)
+            k_sel = next((k for k, o in enumerate(orient[i]) if solution[o.Index()]), None)
+            l, w, h = perms_list[i][k_sel] if k_sel is not None else (None, None, None)
+            pos = (solution[x[i].Index()], solution[y[i].Index()], solution[z[i].Index()]) if k_sel is not None else (None, None, None)
+            # Report the orientation code of the full rotation enumeration (see table below);
+            # for boxes with equal sides the model only has the distinct orientations
+            orient_idx = rotation_orientations(boxes_local[i], i).index((l, w, h)) if k_sel is not None else None
             
             # Get effective rotation policy used by the model (from local copy)
             current_rotation = boxes_local[i]['rotation']
@@ -1,9 +1,10 @@
+import copy
 import math
 from pathlib import Path
 
 import pytest
 
-from alns_loop import run_alns_with_library
+from alns_loop import run_alns_with_library, create_repair_cpsat, create_repair_greedy_ffd
 from container_loading_state import ContainerLoadingState
 
 
@@ -139,6 +140,30 @@ def test_alns_positions_are_non_negative_when_placed():
                     assert all(v >= 0 for v in pos)
 
 
+@pytest.mark.timeout(20)
+def test_alns_parallel_replicas_return_best_state():
+    container, initial_assignment = small_good_instance()
+
+    best = run_alns_with_library(
+        initial_assignment=initial_assignment,
+        container=container,
+        step2_settings_file=settings_path(),
+        num_iterations=4,
+        num_remove=1,
+        time_limit=2,
+        max_no_improve=2,
+        phase1_time_limit=1,
+        seed=7,
+        verbose=False,
+        num_replicas=2,
+    )
+
+    assert isinstance(best, ContainerLoadingState)
+    orig = sum(len(c["boxes"]) for c in initial_assignment)
+    assert sum(len(c["boxes"]) for c in best.assignment) == orig
+    assert len(best.statuses) == len(best.assignment)
+
+
 @pytest.mark.timeout(20)
 def test_alns_infeasible_on_bad_instance():
     """
@@ -163,3 +188,195 @@ def test_alns_infeasible_on_bad_instance():
     assert isinstance(best, ContainerLoadingState)
     # Expect at least one infeasible container due to the 7-length box
     assert any(s == "INFEASIBLE" for s in best.statuses)
+
+
+def test_repair_greedy_ffd_reinserts_removed_items_within_capacity():
+    container, initial_assignment = small_good_instance()
+    state = ContainerLoadingState(initial_assignment, container, settings_path(), verbose=False)
+    removed = state.assignment[0]["boxes"][:2]
+    state.assignment[0]["boxes"] = state.assignment[0]["boxes"][2:]
+    state._removed_items = removed
+
+    repaired = create_repair_greedy_ffd()(state, None)
+
+    ids = sorted(b["id"] for c in repaired.assignment for b in c["boxes"])
+    assert ids == [1, 2, 3, 4, 5]
+    cap = container["size"][0] * container["size"][1] * container["size"][2]
+    for c in repaired.assignment:
+        assert sum(b["size"][0] * b["size"][1] * b["size"][2] for b in c["boxes"]) <= cap
+
+
+def test_repair_greedy_ffd_prefers_container_of_same_group():
+    container = {"size": [4, 4, 4], "weight": 10_000}
+    assignment = [
+        {"id": 1, "size": container["size"], "boxes": [
+            {"id": 1, "size": [2, 2, 2], "weight": 1, "rotation": "free"}]},
+        {"id": 2, "size": container["size"], "boxes": [
+            {"id": 2, "size": [2, 2, 2], "weight": 1, "rotation": "free", "group_id": "g"}]},
+    ]
+    state = ContainerLoadingState(assignment, container, settings_path(), verbose=False)
+    state._removed_items = [{"id": 3, "size": [2, 2, 2], "weight": 1, "rotation": "free", "group_id": "g"}]
+
+    repaired = create_repair_greedy_ffd()(state, None)
+
+    assert [b["id"] for b in repaired.assignment[1]["boxes"]] == [2, 3]
+
+
+def test_repair_cpsat_reinserts_removed_items():
+    container, initial_assignment = small_good_instance()
+    state = ContainerLoadingState(initial_assignment, container, settings_path(), verbose=False)
+    removed = state.assignment[0]["boxes"][:3]
+    state.assignment[0]["boxes"] = state.assignment[0]["boxes"][3:]
+    state._removed_items = removed
+
+    repaired = create_repair_cpsat(max_time_in_seconds=5, num_workers=1)(state, None)
+
+    ids = sorted(b["id"] for c in repaired.assignment for b in c["boxes"])
+    assert ids == [1, 2, 3, 4, 5]
+    assert len(repaired.assignment) == 1
+
+
+def test_repair_cpsat_without_solution_falls_back_to_first_fit():
+    container, initial_assignment = small_good_instance()
+    state = ContainerLoadingState(initial_assignment, container, settings_path(), verbose=False)
+    removed = state.assignment[0]["boxes"][:3]
+    state.assignment[0]["boxes"] = state.assignment[0]["boxes"][3:]
+    state._removed_items = removed
+
+    # No time to find a solution: the solve ends UNKNOWN
+    repaired = create_repair_cpsat(max_time_in_seconds=0.0, num_workers=1)(state, None)
+
+    ids = sorted(b["id"] for c in repaired.assignment for b in c["boxes"])
+    assert ids == [1, 2, 3, 4, 5]
+
+
+def test_repair_cpsat_with_infeasible_fixed_items_falls_back_to_first_fit():
+    container, initial_assignment = small_good_instance()
+    # The three items left in place weigh 30 > 25: the fixed-item assumptions are infeasible
+    container = {"size": container["size"], "weight": 25}
+    state = ContainerLoadingState(initial_assignment, container, settings_path(), verbose=False)
+    removed = state.assignment[0]["boxes"][3:]
+    state.assignment[0]["boxes"] = state.assignment[0]["boxes"][:3]
+    state._removed_items = removed
+
+    repaired = create_repair_cpsat(max_time_in_seconds=5, num_workers=1)(state, None)
+
+    assert [[b["id"] for b in c["boxes"]] for c in repaired.assignment] == [[1, 2, 3], [4, 5]]
+
+
+def test_repair_cpsat_single_item_uses_first_fit():
+    container, initial_assignment = small_good_instance()
+    state = ContainerLoadingState(initial_assignment, container, settings_path(), verbose=False)
+    removed = state.assignment[0]["boxes"][:1]
+    state.assignment[0]["boxes"] = state.assignment[0]["boxes"][1:]
+    state._removed_items = removed
+
+    repaired = create_repair_cpsat(max_time_in_seconds=5, num_workers=1)(state, None)
+
+    assert [b["id"] for b in repaired.assignment[0]["boxes"]] == [2, 3, 4, 5, 1]
+
+
+def test_state_copy_does_not_share_containers_with_original():
+    container, initial_assignment = small_good_instance()
+    state = ContainerLoadingState(initial_assignment, container, settings_path(), verbose=False)
+    assert state.assignment[0]["boxes"][0] is not initial_assignment[0]["boxes"][0]
+
+    clone = copy.deepcopy(state)
+    clone.assignment[0]["boxes"].pop()
+    clone.assignment.append({"id": 2, "size": container["size"], "boxes": []})
+
+    assert len(state.assignment) == 1
+    assert [b["id"] for b in state.assignment[0]["boxes"]] == [1, 2, 3, 4, 5]
+
+
+def test_evaluate_reuses_phase2_result_for_unchanged_container(monkeypatch):
+    import container_loading_state
+
+    container, initial_assignment = small_good_instance()
+    calls = []
+    real_run_phase_2 = container_loading_state.run_phase_2
+
+    def counting_run_phase_2(*args, **kwargs):
+        calls.append(args)
+        return real_run_phase_2(*args, **kwargs)
+
+    monkeypatch.setattr(container_loading_state, "run_phase_2", counting_run_phase_2)
+    monkeypatch.setattr(container_loading_state, "_phase2_cache", type(container_loading_state._phase2_cache)())
+
+    state = ContainerLoadingState(initial_assignment, container, settings_path(), verbose=False)
+    state.evaluate()
+    reordered = state.copy()
+    reordered.assignment[0]["boxes"].reverse()
+    reordered.invalidate()
+    reordered.evaluate()
+
+    assert len(calls) == 1
+    assert reordered.statuses == state.statuses
+    for box in reordered.assignment[0]["boxes"]:
+        original = next(b for b in state.assignment[0]["boxes"] if b["id"] == box["id"])
+        assert box["final_position"] == original["final_position"]
+
+    reordered.invalidate(container_id=1)
+    reordered.evaluate()
+    assert len(calls) == 2
+
+
+def test_evaluate_without_parallel_stays_in_process(monkeypatch):
+    import container_loading_state
+
+    container, initial_assignment = small_good_instance()
+    boxes = initial_assignment[0]["boxes"]
+    split = [
+        {"id": 1, "size": container["size"], "boxes": boxes[:3]},
+        {"id": 2, "size": container["size"], "boxes": boxes[3:]},
+    ]
+
+    def no_pool():
+        raise AssertionError("pool used with parallel=False")
+
+    monkeypatch.setattr(container_loading_state, "PHASE2_MAX_PROCESSES", 2)
+    monkeypatch.setattr(container_loading_state, "_get_phase2_pool", no_pool)
+    monkeypatch.setattr(container_loading_state, "_phase2_cache", type(container_loading_state._phase2_cache)())
+
+    state = ContainerLoadingState(split, container, settings_path(), verbose=False, parallel=False)
+    clone = state.copy()
+    assert clone.parallel is False
+    clone.evaluate()
+    assert clone.statuses == ["OPTIMAL", "OPTIMAL"]
+
+
+def test_objective_is_cached_until_invalidated(monkeypatch):
+    container, initial_assignment = small_good_instance()
+    evaluations = []
+    real_evaluate = ContainerLoadingState.evaluate
+
+    def counting_evaluate(self):
+        evaluations.append(self)
+        return real_evaluate(self)
+
+    monkeypatch.setattr(ContainerLoadingState, "evaluate", counting_evaluate)
+
+    state = ContainerLoadingState(initial_assignment, container, settings_path(), verbose=False)
+    first = state.objective()
+    assert state.objective() == first
+    assert state.is_feasible()
+    assert state.copy().objective() == first
+    assert len(evaluations) == 1
+
+    state.invalidate()
+    assert state.objective() == first
+    assert len(evaluations) == 2
+
+
+def test_solved_placements_get_a_rotation_description():
+    from main import _rotation_desc
+    container, initial_assignment = small_good_instance()
+    state = ContainerLoadingState(initial_assignment, container, settings_path(), verbose=False)
+    state.evaluate()
+
+    placements = state.visualization_data[0]["placements"]
+    assert len(placements) == 5
+    assert all(_rotation_desc(p) is not None for p in placements)
+    # Box 5 is 'z': its codes index the two height-preserving orientations
+    box5 = next(p for p in placements if p["id"] == 5)
+    assert _rotation_desc(box5) in ("L,W,H", "W,L,H")
@@ -100,13 +100,14 @@ def test_free_rotation_four_tall_boxes_rotate_flat_to_fit_shallow_container():
     assert status == cp_model.OPTIMAL
     # Check that all boxes are placed inside the container and do not overlap, and that orientation is valid
     positions = set()
-    possible_box_orientations : int = 6
+    # Equal sides collapse orientations: a 1x1x4 box has 3 distinct ones
+    assert all(len(orient[i]) == 3 for i in range(n))
     for i in range(n):
         xi = solver.Value(x[i])
         yi = solver.Value(y[i])
         zi = solver.Value(z[i])
         # Only one orientation is selected and it must be one with h=1
-        orient_val = [solver.Value(orient[i][k]) for k in range(possible_box_orientations)]
+        orient_val = [solver.Value(orient[i][k]) for k in range(len(orient[i]))]
         assert sum(orient_val) == 1
         k_sel = orient_val.index(1)
         l_sel, w_sel, h_sel = perms_list[i][k_sel]
@@ -225,13 +226,12 @@ def test_free_rotation_mixed_boxes_pack_optimally_in_4x4x2():
     assert status == cp_model.OPTIMAL
     # Check that all boxes are placed inside the container and do not overlap, and that orientation is valid
     positions = set()
-    possible_box_orientations : int = 6
     for i in range(n):
         xi = solver.Value(x[i])
         yi = solver.Value(y[i])
         zi = solver.Value(z[i])
         # Only one orientation is selected and it must be one with h=1
-        orient_val = [solver.Value(orient[i][k]) for k in range(possible_box_orientations)]
+        orient_val = [solver.Value(orient[i][k]) for k in range(len(orient[i]))]
         assert sum(orient_val) == 1
         k_sel = orient_val.index(1)
         l_sel, w_sel, h_sel = perms_list[i][k_sel]
@@ -275,3 +275,102 @@ def test_free_rotation_mixed_boxes_pack_optimally_in_4x4x2():
     # Pass container as dict with 'size' key per visualize_solution API
     visualize_solution(0, {"size": list(container)}, boxes, placements, str(status))
 
+
+
+def test_no_floating_keeps_stacking_and_skips_impossible_supports():
+    """Two half-height boxes may stack; a box taller than half the container never supports its twin."""
+    from model_setup import setup_3d_bin_packing_model
+    from model_constraints import add_no_floating_constraint
+
+    def solve(box_height):
+        model = cp_model.CpModel()
+        boxes = [{"size": (4, 4, box_height), "id": i, "rotation": "none"} for i in (1, 2)]
+        container = (4, 4, 10)
+        n, x, y, z, perms_list, orient, l_eff, w_eff, h_eff = setup_3d_bin_packing_model(model, container, boxes)
+        add_no_overlap_constraint(model, n, x, y, z, l_eff, w_eff, h_eff, container)
+        add_inside_container_constraint(model, n, x, y, z, l_eff, w_eff, h_eff, container)
+        add_no_floating_constraint(model, n, x, y, z, l_eff, w_eff, h_eff)
+        n_above = sum(1 for v in model.Proto().variables if v.name.startswith('above_'))
+        solver = cp_model.CpSolver()
+        return solver.Solve(model), sorted(solver.Value(v) for v in z), n_above
+
+    status, z_values, n_above = solve(5)
+    assert status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    assert z_values == [0, 5]
+    assert n_above == 2
+
+    status, _, n_above = solve(6)
+    assert status == cp_model.INFEASIBLE
+    assert n_above == 0
+
+
+def test_no_overlap_skips_axes_where_two_boxes_cannot_sit_side_by_side():
+    """Two 6-long boxes in a 10-long container can only be separated along y or z."""
+    from model_setup import setup_3d_bin_packing_model
+    model = cp_model.CpModel()
+    boxes = [{"size": (6, 4, 4), "id": i, "rotation": "none"} for i in (1, 2)]
+    container = (10, 10, 10)
+    n, x, y, z, perms_list, orient, l_eff, w_eff, h_eff = setup_3d_bin_packing_model(model, container, boxes)
+    add_no_overlap_constraint(model, n, x, y, z, l_eff, w_eff, h_eff, container)
+    names = [v.name for v in model.Proto().variables]
+    assert not any('left_of' in name or 'right_of' in name for name in names)
+    assert any('front_of' in name for name in names)
+    solver = cp_model.CpSolver()
+    status = solver.Solve(model)
+    assert status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    separated = (
+        solver.Value(y[0]) + 4 <= solver.Value(y[1]) or solver.Value(y[1]) + 4 <= solver.Value(y[0]) or
+        solver.Value(z[0]) + 4 <= solver.Value(z[1]) or solver.Value(z[1]) + 4 <= solver.Value(z[0])
+    )
+    assert separated
+
+
+def test_shared_base_areas_follow_the_chosen_orientation():
+    """get_base_areas matches l_eff * w_eff and is reused by the soft constraint terms."""
+    from model_setup import setup_3d_bin_packing_model
+    from model_optimizations import get_base_areas, prefer_put_boxes_lower_z, get_total_floor_area_covered
+    from model_constraints import add_no_floating_constraint
+    model = cp_model.CpModel()
+    boxes = [{"size": (2, 3, 5), "id": 1, "rotation": "free"}]
+    container = (10, 10, 10)
+    n, x, y, z, perms_list, orient, l_eff, w_eff, h_eff = setup_3d_bin_packing_model(model, container, boxes)
+    on_floor_vars = add_no_floating_constraint(model, n, x, y, z, l_eff, w_eff, h_eff)
+    base_areas = get_base_areas(model, n, perms_list, orient)
+    proto = model.Proto()
+    n_products = sum(c.has_int_prod() for c in proto.constraints)
+    weighted = prefer_put_boxes_lower_z(model, n, z, l_eff, w_eff, container, base_areas)
+    area_vars = get_total_floor_area_covered(model, n, on_floor_vars, l_eff, w_eff, container, perms_list, orient, base_areas)
+    # Only the base area * height product is added: the base area itself is not recomputed
+    assert sum(c.has_int_prod() for c in proto.constraints) == n_products + 1
+    model.Add(h_eff[0] == 2)
+    model.Maximize(area_vars[0])
+    solver = cp_model.CpSolver()
+    assert solver.Solve(model) == cp_model.OPTIMAL
+    assert solver.Value(base_areas[0]) == solver.Value(l_eff[0]) * solver.Value(w_eff[0]) == 15
+    assert solver.Value(area_vars[0]) == 15
+    assert solver.Value(weighted[0]) == 15 * (10 - solver.Value(z[0]))
+
+
+def test_surface_contact_counts_the_base_area_once_per_support():
+    """A box resting on two boxes gets its base area once for each of them, with no per-pair product."""
+    from model_setup import setup_3d_bin_packing_model
+    from model_optimizations import prefer_maximize_surface_contact
+    model = cp_model.CpModel()
+    boxes = [
+        {"size": (2, 4, 3), "id": 1, "rotation": "none"},
+        {"size": (2, 4, 3), "id": 2, "rotation": "none"},
+        {"size": (4, 4, 2), "id": 3, "rotation": "none"},
+    ]
+    container = (8, 4, 10)
+    n, x, y, z, perms_list, orient, l_eff, w_eff, h_eff = setup_3d_bin_packing_model(model, container, boxes)
+    add_no_overlap_constraint(model, n, x, y, z, l_eff, w_eff, h_eff, container)
+    contact_area_vars = prefer_maximize_surface_contact(model, n, x, y, z, l_eff, w_eff, h_eff, container)
+    proto = model.Proto()
+    assert not any(v.name.startswith('contact_area_2_on_') for v in proto.variables)
+    model.Add(z[0] == 0)
+    model.Add(z[1] == 0)
+    model.Add(z[2] == 3)
+    model.Maximize(contact_area_vars[2])
+    solver = cp_model.CpSolver()
+    assert solver.Solve(model) == cp_model.OPTIMAL
+    assert solver.Value(contact_area_vars[2]) == 2 * 16
@@ -143,3 +143,16 @@ def test_negative_preference_weight_raises(tmp_path):
     with pytest.raises(ValueError) as e:
         load_data_from_json(path)
     assert "must be a non-negative number" in str(e.value)
+
+
+def test_load_json_cached_reparses_only_when_file_changes(tmp_path):
+    from load_utils import load_json_cached
+
+    path = _write_json(tmp_path, {"symmetry_mode": "full"})
+    first = load_json_cached(path)
+    assert load_json_cached(path) is first
+
+    _write_json(tmp_path, {"symmetry_mode": "partial", "anchor_mode": None})
+    second = load_json_cached(path)
+    assert second is not first
+    assert second["symmetry_mode"] == "partial"
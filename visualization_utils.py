@@ -52,8 +52,15 @@ def visualize_solution(
     # Ensure a non-interactive backend under pytest/headless to avoid Tk errors.
     try:
         import os
+        import sys
         import matplotlib
-        if os.environ.get("PYTEST_CURRENT_TEST"):
+        headless = (
+            sys.platform.startswith("linux")
+            and not os.environ.get("DISPLAY")
+            and not os.environ.get("WAYLAND_DISPLAY")
+            and not os.environ.get("MPLBACKEND")
+        )
+        if os.environ.get("PYTEST_CURRENT_TEST") or headless:
             try:
                 matplotlib.use("Agg", force=True)
             except Exception:
@@ -115,6 +122,8 @@ def visualize_solution(
     # Use modern, non-deprecated colormap access. We don't rely on LUT sizing
     # to keep compatibility across Matplotlib versions.
     colors = plt.get_cmap('tab20')
+    # All face colors in one colormap call rather than one call per box
+    face_colors = colors([i % colors.N for i in range(n_local)])
     for i in range(n_local):
         placement = placements[i]
         xi, yi, zi = placement['position']
@@ -142,7 +151,7 @@ def visualize_solution(
         box = Poly3DCollection(
             faces,
             alpha=0.5,
-            facecolor=colors(i % colors.N),
+            facecolor=face_colors[i],
             edgecolor='k'
         )
         ax.add_collection3d(box)